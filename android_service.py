@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Android 后台监控服务入口
+由 buildozer.spec 中的 services = Monitor:android_service.py:foreground 声明，python-for-android
+在独立的前台服务进程中运行本文件：执行 monitor_service 的检测循环（不加载Kivy），界面退到后台或被关闭后
+仍继续检测并发送系统通知；界面通过服务参数传入的Unix套接字连接（monitor_service.ServiceClient）
+"""
+
+import logging
+import os
+
+from monitor_service import DEFAULT_SOCKET, run_service
+from nba_game_reminder import NBAGameReminder
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_ID = 'nba_reminder_channel'
+
+
+class AndroidServiceReminder(NBAGameReminder):
+    """在服务进程中通过 Android NotificationManager 发送提醒"""
+
+    def _notify(self, game):
+        from jnius import autoclass
+
+        service = autoclass('org.kivy.android.PythonService').mService
+        Context = autoclass('android.content.Context')
+        Notification = autoclass('android.app.Notification')
+        NotificationChannel = autoclass('android.app.NotificationChannel')
+        NotificationManager = autoclass('android.app.NotificationManager')
+        Build = autoclass('android.os.Build$VERSION')
+
+        time_str = f"{game.clock // 60}:{game.clock % 60:02d}" if game.clock is not None else "未知"
+        message = (f"{game.team1 or '未知'} {game.score1} - {game.score2} {game.team2 or '未知'} | "
+                   f"{game.period or '未知'} 剩余 {time_str} | 紧张度: {self.clutch.score(game):.0%}")
+        try:
+            manager = service.getSystemService(Context.NOTIFICATION_SERVICE)
+            if Build.SDK_INT >= 26:
+                channel = NotificationChannel(CHANNEL_ID, "NBA提醒", NotificationManager.IMPORTANCE_HIGH)
+                manager.createNotificationChannel(channel)
+                builder = Notification.Builder(service, CHANNEL_ID)
+            else:
+                builder = Notification.Builder(service)
+            builder.setContentTitle("⚡ NBA压哨绝杀提醒 ⚡")
+            builder.setContentText(message)
+            builder.setSmallIcon(service.getApplicationInfo().icon)
+            builder.setAutoCancel(True)
+            # 每场比赛一个通知编号，同一场比赛的新提醒替换旧通知
+            manager.notify(hash((game.team1, game.team2)) & 0x7fffffff, builder.build())
+            return True
+        except Exception as e:
+            logger.error(f"发送Android通知失败: {e}")
+            return False
+
+
+def main():
+    # 界面启动服务时把套接字路径作为服务参数传入（应用私有目录中）
+    address = os.environ.get('PYTHON_SERVICE_ARGUMENT') or DEFAULT_SOCKET
+    run_service(address, reminder=AndroidServiceReminder())
+
+
+if __name__ == "__main__":
+    main()
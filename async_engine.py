@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步监控引擎
+与 NBAGameReminder.run 并列的asyncio版本主循环：多个数据源并发抓取，
+解析放在线程池/进程池中执行，通知交给提醒器的通知队列在后台发送，每个任务都有单独的超时并支持取消，
+一个慢请求不会拖慢其他比赛的检测
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+from http_fetcher import PageFetcher
+from game_parser import BoxCache, get_parser_backend
+
+logger = logging.getLogger(__name__)
+
+# 进程池中每个工作进程的解析引擎和盒子缓存，由 _init_parse_worker 创建
+_worker_parser = None
+_worker_cache = None
+
+
+def _init_parse_worker(backend_name=None):
+    """进程池的初始化函数：每个工作进程只创建一次解析引擎，盒子缓存在该进程的多次解析之间复用"""
+    global _worker_parser, _worker_cache
+    _worker_parser = get_parser_backend(backend_name)
+    _worker_cache = BoxCache()
+
+
+def parse_page(html, backend_name=None):
+    """解析比赛页面，返回比赛列表（模块级函数，可在进程池中执行）
+
+    在 _init_parse_worker 初始化过的工作进程中复用该进程的解析引擎和盒子缓存；
+    缓存命中统计留在工作进程内，不计入主进程的指标
+    """
+    if _worker_parser is None:
+        _init_parse_worker(backend_name)
+    games = []
+    for game_info in _worker_cache.extract_all(_worker_parser, _worker_parser.find_boxes(html)):
+        if game_info and game_info.get('score1') is not None:
+            games.append(game_info)
+    return games
+
+
+class StepBusy(Exception):
+    """上一次执行的同一步骤（超时后仍在线程中运行）还没有结束"""
+
+
+class Source:
+    """额外数据源（如单场比赛的详情页），handler在线程池中处理页面内容"""
+
+    def __init__(self, name, url, handler=None):
+        self.name = name
+        self.url = url
+        self.handler = handler
+        self.fetcher = None
+
+
+class AsyncMonitorEngine:
+    """基于asyncio的监控引擎"""
+
+    def __init__(self, reminder, fetch_timeout=15, parse_timeout=10, max_workers=4, use_processes=False):
+        self.reminder = reminder
+        self.fetch_timeout = fetch_timeout
+        self.parse_timeout = parse_timeout
+        self.sources = {}
+        self.source_results = {}  # 数据源名称 -> handler 的最新处理结果
+
+        # 网络请求和通知在线程池中执行，解析可选进程池
+        self.io_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nba-io')
+        if use_processes:
+            self.parse_executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_parse_worker,
+                                                      initargs=(reminder.parser.name,))
+        else:
+            self.parse_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nba-parse')
+
+        self._running = {}  # 步骤名称 -> 最近一次执行的future（超时后线程仍在运行，直到它结束）
+        self._stop = None
+
+    def add_source(self, name, url, handler=None):
+        """添加一个与比赛页面并发抓取的数据源"""
+        source = Source(name, url, handler)
+        source.fetcher = PageFetcher(url, headers=self.reminder.headers,
+                                     timeout=self.reminder.fetcher.timeout)
+        self.sources[name] = source
+        return source
+
+    async def _in_executor(self, step, executor, timeout, func, *args, on_late=None):
+        """在线程池/进程池中执行一个步骤，超过 timeout 秒抛出 asyncio.TimeoutError
+
+        超时不能中断已经在运行的线程，它会继续使用共享的会话和盒子缓存：
+        该步骤结束前同名步骤不再开始新的执行（抛出 StepBusy），结束时调用 on_late()
+        """
+        running = self._running.get(step)
+        if running is not None and not running.done():
+            raise StepBusy(step)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, func, *args)
+        # 超时后没有人等待结果，在这里取走异常，避免 "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._running[step] = future
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if on_late is not None:
+                future.add_done_callback(lambda f: on_late())
+            raise
+
+    async def poll_games(self):
+        """抓取并解析比赛页面，新满足条件的比赛放入通知队列"""
+        reminder = self.reminder
+        # 超时的抓取结束时已记录新的ETag，但页面没有被解析：清除条件请求头，下次重新下载完整页面
+        html = await self._in_executor('fetch:games', self.io_executor, self.fetch_timeout, reminder.fetch_games,
+                                       on_late=reminder.fetcher.reset_validators)
+        if not html:
+            if reminder.last_fetch is not None and reminder.last_fetch.not_modified:
+                logger.info("页面未变化，跳过本次解析")
+            return reminder.current_games
+
+        try:
+            if isinstance(self.parse_executor, ProcessPoolExecutor):
+                # 工作进程中的耗时指标不会回到主进程，解析耗时（含进程间传输）在这里记录
+                start = time.perf_counter()
+                games = await self._in_executor('parse:games', self.parse_executor, self.parse_timeout,
+                                                parse_page, html, reminder.parser.name)
+                metrics.PARSE_DURATION.observe(time.perf_counter() - start)
+                metrics.PARSE_GAMES.set(len(games))
+            else:
+                # 线程池中直接复用提醒器的解析引擎和盒子缓存
+                games = await self._in_executor('parse:games', self.parse_executor, self.parse_timeout,
+                                                reminder.parse_game_info, html)
+        except asyncio.TimeoutError:
+            # 本次页面的解析结果被丢弃，下次不能用 304 跳过解析
+            reminder.fetcher.reset_validators()
+            raise
+        reminder.ingest(games)
+
+        if not games:
+            logger.warning("⚠ 未找到比赛数据，可能是页面结构变化或当前没有比赛")
+            return games
+
+        logger.info(f"✓ 成功获取 {len(games)} 场比赛数据")
+        # 与同步主循环相同：合并、去重和优先级由通知队列处理，发送在队列的工作线程中进行
+        reminder.process_games(games)
+        return games
+
+    async def poll_source(self, source):
+        """抓取并处理一个额外数据源"""
+        result = await self._in_executor(f'fetch:{source.name}', self.io_executor, self.fetch_timeout,
+                                         source.fetcher.fetch, on_late=source.fetcher.reset_validators)
+        if result.text is None:
+            return None
+        value = result.text
+        if source.handler is not None:
+            try:
+                value = await self._in_executor(f'parse:{source.name}', self.parse_executor, self.parse_timeout,
+                                                source.handler, result.text)
+            except asyncio.TimeoutError:
+                source.fetcher.reset_validators()
+                raise
+        self.source_results[source.name] = value
+        return value
+
+    async def poll_once(self):
+        """并发执行一轮所有数据源的抓取，单个任务失败或超时不影响其他任务"""
+        self.reminder.scheduler.mark_poll()
+        tasks = {'games': asyncio.create_task(self.poll_games())}
+        for name, source in self.sources.items():
+            tasks[name] = asyncio.create_task(self.poll_source(source))
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for name, result in zip(tasks, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.error(f"数据源 {name} 处理超时")
+            elif isinstance(result, StepBusy):
+                logger.warning(f"数据源 {name} 上一次的 {result} 仍在执行，跳过本次")
+            elif isinstance(result, Exception):
+                logger.error(f"数据源 {name} 处理出错: {result}")
+        return results[0] if not isinstance(results[0], Exception) else None
+
+    async def run(self):
+        """运行异步主循环，直到 stop() 或任务被取消"""
+        reminder = self.reminder
+        self._stop = asyncio.Event()
+        logger.info("NBA压哨绝杀球提醒系统（异步引擎）已启动")
+        try:
+            while not self._stop.is_set():
+                await self.poll_once()
+                delay = reminder.scheduler.next_interval(reminder.current_games)
+                logger.info(f"等待{delay:.0f}秒后再次检查...")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.shutdown()
+
+    def stop(self):
+        """请求停止主循环"""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def shutdown(self):
+        """释放资源：关闭提醒器（发送完排队的通知、保存状态）和额外数据源"""
+        self.reminder.close()
+        for source in self.sources.values():
+            source.fetcher.close()
+        self.io_executor.shutdown(wait=False, cancel_futures=True)
+        self.parse_executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("异步引擎已退出，状态已保存")
+
+
+def main():
+    """主函数"""
+    from nba_game_reminder import NBAGameReminder
+    engine = AsyncMonitorEngine(NBAGameReminder())
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        logger.info("程序被用户中断")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线基准测试 - 抓取之后的 解析→检测→提醒 流程
+基于 test_debug.html 和 synthetic_pages 生成的合成页面，不访问网络；
+输出各环节的吞吐量、延迟分位数、峰值内存和冷启动导入耗时，结果可保存为JSON用于跨版本对比
+
+用法:
+    python bench_nba_reminder.py                    # 打印结果
+    python bench_nba_reminder.py --json bench.json  # 同时保存机器可读结果
+    python bench_nba_reminder.py --sizes 10,100,10000 --malformed 0.05
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from log_setup import setup_logging
+
+# 基准不写日志文件：先按只输出到控制台配置日志，导入 nba_game_reminder 时不再创建 nba_reminder.log
+setup_logging(path=None)
+
+from nba_game_reminder import NBAGameReminder  # noqa: E402
+from notification_store import NotificationStore  # noqa: E402
+from game_record import Game  # noqa: E402
+from rule_engine import GameColumns, Rule, RuleSet  # noqa: E402
+from subscriptions import SubscriptionIndex  # noqa: E402
+from synthetic_pages import generate_page  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEBUG_PAGE = os.path.join(BASE_DIR, 'test_debug.html')
+
+# 测量冷启动导入耗时的模块（命令行/守护进程入口不应加载Kivy、requests、lxml）
+IMPORT_MODULES = ('reminder_core', 'nba_game_reminder')
+
+# 规则引擎基准中的用户规则数
+BENCH_RULES = 500
+# 订阅索引基准中的订阅用户数（匹配耗时应与用户数无关）
+BENCH_SUBSCRIBERS = (1000, 100000)
+
+
+class BenchReminder(NBAGameReminder):
+    """基准测试用提醒器：不弹出真实通知，提醒记录在临时目录中（不读取当前目录的状态文件），不按合并窗口跳过提醒"""
+
+    def __init__(self, state_dir):
+        super().__init__(state_dir)
+        self.NOTIFY_COALESCE_WINDOW = 0
+
+    def reset_notified(self):
+        """换用空的提醒记录，下一次 process_games 重新检测并提醒全部满足条件的比赛"""
+        self.notification_store = NotificationStore(self.state_file)
+
+    def send_notification(self, game):
+        return True
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(name, func, args_list, min_time=0.5, items_per_call=1):
+    """重复执行 func(*args) 至少 min_time 秒，返回吞吐量和延迟分位数（毫秒）"""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or not samples:
+        for args in args_list:
+            start = time.perf_counter_ns()
+            func(*args)
+            samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    total_s = sum(samples) / 1e9
+    to_ms = 1e-6
+    return {
+        'name': name,
+        'calls': len(samples),
+        'ops_per_sec': len(samples) / total_s if total_s else 0.0,
+        'items_per_sec': len(samples) * items_per_call / total_s if total_s else 0.0,
+        'mean_ms': total_s * 1000 / len(samples),
+        'p50_ms': percentile(samples, 50) * to_ms,
+        'p90_ms': percentile(samples, 90) * to_ms,
+        'p99_ms': percentile(samples, 99) * to_ms,
+        'max_ms': samples[-1] * to_ms,
+    }
+
+
+def peak_memory_kb(func, *args):
+    """单次调用期间的Python内存分配峰值（KB）"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def max_rss_kb():
+    """进程的常驻内存峰值（KB），包括lxml等C扩展的分配；不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回KB
+    return rss / 1024 if sys.platform == 'darwin' else rss
+
+
+def import_time_ms(module, runs=5):
+    """在新进程中导入模块的累计耗时（python -X importtime，取中位数，毫秒）"""
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    samples = []
+    with tempfile.TemporaryDirectory() as cwd:  # 导入时创建的日志文件写到临时目录
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                  cwd=cwd, env=env, capture_output=True, text=True, check=True)
+            for line in proc.stderr.splitlines():
+                parts = line.split('|')
+                if len(parts) == 3 and parts[2].strip() == module:
+                    samples.append(int(parts[1]) / 1000)
+    samples.sort()
+    return samples[len(samples) // 2] if samples else None
+
+
+def synthetic_rules(n, teams, seed=0):
+    """生成 n 条随机的用户规则（球队、节次、剩余时间和分差窗口）"""
+    rng = random.Random(seed)
+    teams = sorted(set(teams)) or ['未知球队']
+    rules = []
+    for i in range(n):
+        low_clock = rng.randint(0, 30)
+        low_margin = rng.randint(0, 3)
+        rules.append(Rule(f"规则{i}",
+                          teams=rng.sample(teams, min(2, len(teams))) if rng.random() < 0.5 else None,
+                          periods=rng.choice([('Q4', 'OT'), ('OT',), None]),
+                          clock=(low_clock, rng.randint(low_clock, 720)),
+                          margin=(0, 0) if rng.random() < 0.2 else (low_margin, rng.randint(low_margin, 20))))
+    return rules
+
+
+def bench_subscriptions(games, min_time):
+    """每次轮询只有一场比赛的比分变化时，订阅索引的匹配耗时"""
+    teams = [t for g in games for t in (g.team1, g.team2)]
+    # 用户的提醒阈值集中在少数几种组合上
+    shapes = synthetic_rules(8, teams, seed=1)
+    rng = random.Random(2)
+    first = games[0]
+    changed = [Game(first.team1, first.team2, first.score1 + 1, first.score2, first.period, first.clock)]
+    slates = [(games,), (changed + games[1:],)]
+    results = []
+    for count in BENCH_SUBSCRIBERS:
+        index = SubscriptionIndex()
+        for i in range(count):
+            shape = rng.choice(shapes)
+            favourites = rng.sample(teams, min(2, len(teams))) if rng.random() < 0.9 else None
+            index.subscribe(i, Rule(i, teams=favourites, periods=shape.periods, clock=shape.clock,
+                                    margin=shape.margin))
+        index.match(games)
+        result = measure(f'subscriptions_{count}', index.match, slates, min_time, len(games))
+        result['page'] = 'test_debug.html'
+        result['games'] = len(games)
+        results.append(result)
+    return results
+
+
+def bench_page(reminder, label, html, min_time):
+    """对一个页面运行全部基准，返回结果列表"""
+    results = []
+
+    def parse_cold(page):
+        # 清空盒子缓存，测量完整解析
+        reminder.box_cache.clear()
+        return reminder.parse_game_info(page)
+
+    games = parse_cold(html)
+    boxes = reminder.parser.find_boxes(html)
+    n_games = len(games)
+
+    results.append(measure('parse_game_info', parse_cold, [(html,)], min_time, n_games))
+    results.append(measure('parse_game_info_cached', reminder.parse_game_info, [(html,)], min_time, n_games))
+    results.append(measure('extract_game_data_from_box', reminder.extract_game_data_from_box,
+                           [(box,) for box in boxes], min_time))
+    results.append(measure('check_game_condition', reminder.check_game_condition,
+                           [(game,) for game in games], min_time))
+    def process_fresh(page_games):
+        # 每次使用空的提醒记录，测量提醒检测和入队，而不是已提醒比赛的跳过路径
+        reminder.reset_notified()
+        reminder.process_games(page_games)
+
+    results.append(measure('process_games', process_fresh, [(games,)], min_time, n_games))
+    ruleset = RuleSet(synthetic_rules(BENCH_RULES, [t for g in games for t in (g.team1, g.team2)]))
+    results.append(measure(f'rule_engine_{BENCH_RULES}', lambda: ruleset.evaluate(GameColumns(games)),
+                           [()], min_time, n_games))
+
+    memory = peak_memory_kb(parse_cold, html)
+    for result in results:
+        result['page'] = label
+        result['games'] = n_games
+    return results, {'page': label, 'games': n_games, 'html_bytes': len(html.encode('utf-8')),
+                     'parse_peak_kb': memory}
+
+
+def run(sizes, min_time, malformed=0.0):
+    with open(DEBUG_PAGE, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    pages = [('test_debug.html', html)]
+    pages += [(f'synthetic_{n}', generate_page(n, malformed=malformed, seed=n)[0]) for n in sizes]
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        reminder = BenchReminder(state_dir)
+        results = []
+        memory = []
+        for label, page in pages:
+            page_results, page_memory = bench_page(reminder, label, page, min_time)
+            results.extend(page_results)
+            memory.append(page_memory)
+        results.extend(bench_subscriptions(reminder.parse_game_info(html), min_time))
+
+    imports = [{'module': module, 'import_ms': import_time_ms(module)} for module in IMPORT_MODULES]
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parser_backend': reminder.parser.name,
+            'min_time_s': min_time,
+            'malformed': malformed,
+            'max_rss_kb': max_rss_kb(),
+        },
+        'results': results,
+        'memory': memory,
+        'imports': imports,
+    }
+
+
+def print_report(report):
+    meta = report['meta']
+    print(f"Python {meta['python']} | 解析引擎: {meta['parser_backend']} | {meta['platform']}")
+    print(f"{'基准':<30}{'页面':<18}{'比赛':>6}{'ops/s':>12}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for r in report['results']:
+        print(f"{r['name']:<30}{r['page']:<18}{r['games']:>6}{r['ops_per_sec']:>12.1f}"
+              f"{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+    print()
+    for m in report['memory']:
+        print(f"解析峰值内存 {m['page']:<18}{m['games']:>6} 场  {m['parse_peak_kb']:>10.1f} KB")
+    for m in report['imports']:
+        print(f"冷启动导入 {m['module']:<24}{m['import_ms']:>10.1f} ms")
+    if meta['max_rss_kb'] is not None:
+        print(f"进程常驻内存峰值: {meta['max_rss_kb']:.0f} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NBA提醒系统离线基准测试")
+    parser.add_argument('--json', help="将结果保存为JSON文件")
+    parser.add_argument('--sizes', default='15,100', help="合成页面的比赛数量，逗号分隔（默认: 15,100）")
+    parser.add_argument('--malformed', type=float, default=0.0, help="合成页面中格式错误盒子的比例（0~1）")
+    parser.add_argument('--min-time', type=float, default=0.5, help="每项基准的最短运行时间（秒）")
+    args = parser.parse_args(argv)
+
+    # 日志照常格式化但不输出，保留日志在 process_games 中的真实开销
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    root.addHandler(logging.StreamHandler(devnull))
+
+    sizes = [int(n) for n in args.sizes.split(',') if n.strip()]
+    report = run(sizes, args.min_time, args.malformed)
+    devnull.close()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,8 +24,11 @@ requirements = python3,kivy>=2.1.0,kivymd>=1.1.1,requests,beautifulsoup4,lxml,py
 # (str) Python版本
 requirements.source.python3 = 3.9
 
-# (list) 应用权限
-android.permissions = INTERNET,POST_NOTIFICATIONS
+# (list) 应用权限（前台服务需要 FOREGROUND_SERVICE）
+android.permissions = INTERNET,POST_NOTIFICATIONS,FOREGROUND_SERVICE
+
+# (list) 后台服务：NAME:入口文件[:foreground]；监控服务在独立进程中运行检测循环，界面关闭后继续提醒
+services = Monitor:android_service.py:foreground
 
 # (int) 目标Android API，应该尽可能高
 android.api = 33
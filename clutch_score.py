@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛紧张度（clutch score）
+由分差、剩余时间、节次和近期得分走势估算领先方胜率，紧张度 = 胜负悬念 × 临近结束程度，取值 0~1；
+每场比赛只保存上一次的分差、比赛进程和走势，每个快照 O(1) 增量更新，一次对全部比赛批量计算
+"""
+
+import math
+
+from game_record import Game, Period
+from poll_scheduler import PERIOD_LENGTH, game_key, is_live
+
+OT_LENGTH = 300  # 加时赛时长（秒）
+REGULATION_LENGTH = 4 * PERIOD_LENGTH
+
+
+def elapsed_seconds(game):
+    """比赛已进行的时间（秒），节次或剩余时间未知时返回None"""
+    if game.period is None or game.clock is None:
+        return None
+    if game.period == Period.OT:
+        return REGULATION_LENGTH + OT_LENGTH - game.clock
+    return (int(game.period) - 1) * PERIOD_LENGTH + PERIOD_LENGTH - game.clock
+
+
+def remaining_seconds(game):
+    """距离比赛（或本节加时）结束的时间（秒），剩余时间未知时按本节过半估算"""
+    if game.period is None:
+        return None
+    length = OT_LENGTH if game.period == Period.OT else PERIOD_LENGTH
+    clock = length / 2 if game.clock is None else game.clock
+    if game.period >= Period.Q4:
+        return clock
+    return (int(Period.Q4) - int(game.period)) * PERIOD_LENGTH + clock
+
+
+class _Trend:
+    """一场比赛的增量状态"""
+
+    __slots__ = ('elapsed', 'diff', 'rate', 'score', 'win_probability')
+
+    def __init__(self, elapsed, diff):
+        self.elapsed = elapsed
+        self.diff = diff
+        self.rate = 0.0  # 分差（球队1 - 球队2）每秒比赛时间的变化，指数平滑
+        self.score = 0.0
+        self.win_probability = 0.5  # 球队1获胜的概率
+
+
+class ClutchTracker:
+    """按比赛保存走势并计算紧张度
+
+    sigma       每 sqrt(秒) 剩余时间的分差波动（NBA全场约 13 分）
+    trend_alpha 走势的平滑系数
+    horizon     走势最多外推的时间（秒），默认一个进攻时限，避免一次得分就大幅改变胜率
+    urgency     临近结束程度的时间尺度（秒），剩余 urgency 秒时权重为 0.5
+    """
+
+    def __init__(self, sigma=0.24, trend_alpha=0.2, horizon=24, urgency=180):
+        self.sigma = sigma
+        self.trend_alpha = trend_alpha
+        self.horizon = horizon
+        self.urgency = urgency
+        self.games = {}  # 比赛标识 -> _Trend
+
+    def update(self, games):
+        """用一次快照更新全部比赛，返回与 games 对应的紧张度列表；不再出现的比赛被移除"""
+        games = [Game.coerce(game) for game in games]
+        previous, self.games = self.games, {}
+        scores = []
+        for game in games:
+            key = game_key(game)
+            trend = self._advance(previous.get(key), game)
+            if trend is not None:
+                self.games[key] = trend
+            scores.append(0.0 if trend is None else trend.score)
+        return scores
+
+    def _advance(self, trend, game):
+        if game.score1 is None or game.score2 is None or not is_live(game):
+            return None
+        diff = game.score1 - game.score2
+        elapsed = elapsed_seconds(game)
+        if trend is None:
+            trend = _Trend(elapsed, diff)
+        elif elapsed is not None and trend.elapsed is not None and elapsed > trend.elapsed:
+            rate = (diff - trend.diff) / (elapsed - trend.elapsed)
+            trend.rate += self.trend_alpha * (rate - trend.rate)
+            trend.elapsed, trend.diff = elapsed, diff
+        elif elapsed is not None and trend.elapsed is not None and elapsed < trend.elapsed:
+            # 进入新的加时赛，比赛进程从加时开始重新计算
+            trend.elapsed, trend.diff = elapsed, diff
+        else:
+            trend.diff = diff
+        self._score(trend, game)
+        return trend
+
+    def _score(self, trend, game):
+        remaining = remaining_seconds(game)
+        if remaining is None:
+            trend.score, trend.win_probability = 0.0, 0.5
+            return
+        projected = trend.diff + trend.rate * min(remaining, self.horizon)
+        spread = self.sigma * math.sqrt(remaining) + 0.5
+        trend.win_probability = 0.5 * (1 + math.erf(projected / (spread * math.sqrt(2))))
+        suspense = 1 - abs(2 * trend.win_probability - 1)
+        trend.score = suspense * self.urgency / (self.urgency + remaining)
+
+    def score(self, game):
+        """最近一次更新时该比赛的紧张度（未跟踪的比赛为0）"""
+        trend = self.games.get(game_key(game))
+        return 0.0 if trend is None else trend.score
+
+    def win_probability(self, game):
+        """最近一次更新时球队1获胜的概率（未跟踪的比赛为None）"""
+        trend = self.games.get(game_key(game))
+        return None if trend is None else trend.win_probability
+
+    def ranked(self):
+        """按紧张度从高到低排列的 (比赛标识, 紧张度)"""
+        return sorted(((key, trend.score) for key, trend in self.games.items()),
+                      key=lambda item: item[1], reverse=True)
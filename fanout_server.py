@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛数据分发服务
+只由一个轮询进程抓取并解析虎扑页面，再通过 Server-Sent Events 把比赛状态变化和关键时刻提醒
+推送给任意数量的订阅端（桌面端、手机应用），避免每个客户端各自抓取页面
+
+接口:
+    GET /events   SSE事件流：snapshot（连接时的全部比赛）、games（变化/结束的比赛）、alert（提醒）、
+                  moment（最后几分钟的领先易主/追平/得分攻势）
+    GET /events?subscriber=ID
+                  同上，并绑定多用户订阅标识：额外收到该用户的提醒 alerts（一次轮询合并为一个事件）
+    GET /games    当前全部比赛（JSON）
+
+用法:
+    python nba_game_reminder.py --serve 8765 --serve-host 0.0.0.0     # 服务端
+    NBA_REMINDER_SERVER=http://192.168.1.10:8765 python main.py     # 手机应用订阅服务端
+"""
+
+import json
+import logging
+import queue
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from game_record import Game
+
+logger = logging.getLogger(__name__)
+
+
+def _game_id(game):
+    return f"{game.get('team1')}_{game.get('team2')}"
+
+
+def _alert_data(game, clutch=None):
+    data = {'game': Game.coerce(game).to_dict()}
+    if clutch is not None:
+        data['clutch'] = round(clutch, 3)
+    return data
+
+
+class Subscriber:
+    """一个订阅端的发送队列；队列满（客户端太慢）时断开，客户端重连后重新获得快照
+
+    subscriber_id 为该连接绑定的多用户订阅标识，只有绑定的连接会收到该用户的提醒
+    """
+
+    def __init__(self, maxsize, subscriber_id=None):
+        self.queue = queue.Queue(maxsize)
+        self.subscriber_id = subscriber_id
+        self.dropped = False
+
+
+class GameHub:
+    """保存最新的比赛状态，把状态变化广播给所有订阅端"""
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self.games = {}  # 比赛标识 -> 比赛字典
+        self.seq = 0  # 事件序号
+        self._subscribers = set()
+        self._routes = {}  # 订阅标识 -> 绑定该标识的连接集合
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self, subscriber_id=None):
+        """新订阅端，队列中的第一个事件是当前全部比赛的快照；subscriber_id 为绑定的订阅用户"""
+        subscriber = Subscriber(self.queue_size, subscriber_id)
+        with self._lock:
+            subscriber.queue.put_nowait((self.seq, 'snapshot', {'games': list(self.games.values())}))
+            self._subscribers.add(subscriber)
+            if subscriber_id is not None:
+                self._routes.setdefault(subscriber_id, set()).add(subscriber)
+        logger.info(f"新订阅端已连接，当前 {len(self._subscribers)} 个")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._discard(subscriber)
+        logger.info(f"订阅端已断开，当前 {len(self._subscribers)} 个")
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.games.values())
+
+    def _discard(self, subscriber):
+        # 调用方持有锁
+        self._subscribers.discard(subscriber)
+        routed = self._routes.get(subscriber.subscriber_id)
+        if routed is not None:
+            routed.discard(subscriber)
+            if not routed:
+                del self._routes[subscriber.subscriber_id]
+
+    def _send(self, subscriber, event, data):
+        # 调用方持有锁
+        try:
+            subscriber.queue.put_nowait((self.seq, event, data))
+        except queue.Full:
+            subscriber.dropped = True
+            self._discard(subscriber)
+            logger.warning("订阅端接收过慢，已断开")
+
+    def _broadcast(self, event, data):
+        # 调用方持有锁
+        self.seq += 1
+        for subscriber in list(self._subscribers):
+            self._send(subscriber, event, data)
+
+    def publish_changes(self, updated, removed):
+        """发布增量变化（game_events 的新增/变化比赛和消失的比赛），不需要比较全部比赛"""
+        updated = [Game.coerce(game).to_dict() for game in updated]
+        removed = [_game_id(Game.coerce(game)) for game in removed]
+        with self._lock:
+            for key in removed:
+                self.games.pop(key, None)
+            for data in updated:
+                self.games[_game_id(data)] = data
+            if updated or removed:
+                self._broadcast('games', {'updated': updated, 'removed': removed})
+
+    def publish_alert(self, game, clutch=None):
+        """向所有订阅端广播一条关键时刻提醒，clutch 为比赛紧张度（0~1）"""
+        with self._lock:
+            self._broadcast('alert', _alert_data(game, clutch))
+
+    def publish_user_alerts(self, alerts):
+        """推送一次轮询的多用户提醒 [(订阅标识, 比赛, 紧张度)]
+
+        只发给绑定了对应订阅标识的连接，同一用户的提醒合并为一个 alerts 事件；
+        没有连接的用户直接跳过，耗时与提醒数成正比，与连接总数无关
+        """
+        grouped = {}
+        for subscriber_id, game, clutch in alerts:
+            grouped.setdefault(subscriber_id, []).append(_alert_data(game, clutch))
+        with self._lock:
+            self.seq += 1
+            for subscriber_id, items in grouped.items():
+                for subscriber in list(self._routes.get(subscriber_id, ())):
+                    self._send(subscriber, 'alerts', {'alerts': items})
+
+    def publish_moment(self, event):
+        """广播一个比赛时间线事件（game_timeline.TimelineEvent）"""
+        with self._lock:
+            self._broadcast('moment', event.to_dict())
+
+
+class _FanoutHandler(BaseHTTPRequestHandler):
+    hub = None
+    heartbeat = 15.0
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/events':
+            subscriber_id = urllib.parse.parse_qs(query).get('subscriber', [None])[0]
+            self._stream_events(subscriber_id)
+        elif path == '/games':
+            body = json.dumps({'games': self.hub.snapshot()}, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def _stream_events(self, subscriber_id=None):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        subscriber = self.hub.subscribe(subscriber_id)
+        try:
+            while not subscriber.dropped:
+                try:
+                    seq, event, data = subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    # 心跳，保持连接并让客户端及时发现断线
+                    self.wfile.write(b': ping\n\n')
+                    self.wfile.flush()
+                    continue
+                payload = json.dumps(data, ensure_ascii=False)
+                self.wfile.write(f"id: {seq}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.hub.unsubscribe(subscriber)
+
+    def log_message(self, format, *args):
+        logger.debug(f"分发服务请求: {format % args}")
+
+
+def start_fanout_server(hub, port, host='127.0.0.1', heartbeat=15.0):
+    """在后台线程启动分发服务，返回服务器对象（调用 shutdown() 停止）"""
+    handler = type('FanoutHandler', (_FanoutHandler,), {'hub': hub, 'heartbeat': heartbeat})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='nba-fanout', daemon=True)
+    thread.start()
+    logger.info(f"比赛数据分发服务已启动: http://{host}:{server.server_address[1]}/events")
+    return server
+
+
+def iter_sse(stream):
+    """逐个解析SSE事件，返回 (事件名, 数据字符串)"""
+    event, data = 'message', []
+    for raw in stream:
+        line = raw.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if data:
+                yield event, '\n'.join(data)
+            event, data = 'message', []
+        elif line.startswith(':'):
+            continue
+        else:
+            field, _, value = line.partition(':')
+            value = value[1:] if value.startswith(' ') else value
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+class FanoutClient:
+    """订阅分发服务，在后台线程维护比赛列表，断线后自动重连
+
+    on_games(games) 在比赛列表变化时调用，on_alert(game) 在收到提醒时调用（均在后台线程中）；
+    subscriber 为多用户订阅中的用户标识，连接时绑定到服务端，服务端只推送全局提醒和发给该用户的提醒
+    """
+
+    def __init__(self, url, on_games=None, on_alert=None, reconnect_delay=5.0, timeout=60.0, subscriber=None):
+        self.url = url.rstrip('/') + '/events'
+        if subscriber is not None:
+            self.url += '?' + urllib.parse.urlencode({'subscriber': subscriber})
+        self.on_games = on_games
+        self.on_alert = on_alert
+        self.reconnect_delay = reconnect_delay
+        self.timeout = timeout  # 超过该时间没有任何数据（包括心跳）视为断线
+        self.subscriber = subscriber
+        # 比赛标识 -> Game；后台线程每次更新都替换为新字典（写时复制），其他线程读取时不会遇到正在修改的字典
+        self.games = {}
+        self.connected = False
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='nba-fanout-client', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _connect(self):
+        """建立连接，返回可关闭的连接对象"""
+        return urllib.request.urlopen(self.url, timeout=self.timeout)
+
+    def _events(self, connection):
+        """逐个返回服务端事件 (事件名, 数据字典)"""
+        for event, data in iter_sse(connection):
+            yield event, json.loads(data)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self._connect() as connection:
+                    self._response = connection
+                    self.connected = True
+                    logger.info(f"已连接比赛数据服务: {self.url}")
+                    for event, data in self._events(connection):
+                        self.handle_event(event, data)
+            except (OSError, ValueError) as e:
+                if not self._stop.is_set():
+                    logger.error(f"比赛数据服务连接失败: {e}")
+            finally:
+                self._response = None
+                self.connected = False
+            self._stop.wait(self.reconnect_delay)
+
+    def snapshot(self):
+        """当前比赛列表的副本（可在任意线程调用）"""
+        return list(self.games.values())
+
+    def handle_event(self, event, data):
+        """处理一个服务端事件"""
+        if event == 'snapshot':
+            self.games = {_game_id(g): Game.from_dict(g) for g in data['games']}
+        elif event == 'games':
+            games = dict(self.games)
+            for key in data['removed']:
+                games.pop(key, None)
+            for g in data['updated']:
+                games[_game_id(g)] = Game.from_dict(g)
+            self.games = games
+        elif event == 'alert':
+            if self.on_alert is not None:
+                self.on_alert(Game.from_dict(data['game']))
+            return
+        elif event == 'alerts':
+            if self.on_alert is not None:
+                for item in data['alerts']:
+                    self.on_alert(Game.from_dict(item['game']))
+            return
+        else:
+            return
+        if self.on_games is not None:
+            self.on_games(self.snapshot())
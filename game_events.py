@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛状态变化事件
+比较相邻两次快照，生成类型化的增量事件（比分变化、换节、进入关键时刻、比赛结束等），
+通过进程内的发布/订阅分发；日志、分发服务等只处理真正变化的比赛，耗时与变化量成正比而不是比赛总数
+
+    bus = EventBus()
+    bus.subscribe(ScoreChanged, lambda event: print(event.game))
+    for event in ChangeCapture().diff(games):
+        bus.publish(event)
+"""
+
+import logging
+import threading
+
+from game_record import Game
+
+logger = logging.getLogger(__name__)
+
+
+class GameEvent:
+    """所有比赛事件的基类；previous 为上一次快照中的比赛状态（新出现的比赛为None）"""
+
+    __slots__ = ('game', 'previous')
+
+    def __init__(self, game, previous=None):
+        self.game = game
+        self.previous = previous
+
+    @property
+    def key(self):
+        return (self.game.team1, self.game.team2)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.game!r})"
+
+
+class GameAdded(GameEvent):
+    """比赛第一次出现在页面上"""
+    __slots__ = ()
+
+
+class GameUpdated(GameEvent):
+    """比赛状态有任何变化（比分、节次、剩余时间、状态），在具体的变化事件之后发布"""
+    __slots__ = ()
+
+
+class GameRemoved(GameEvent):
+    """比赛从页面上消失（game 为最后一次看到的状态）"""
+    __slots__ = ()
+
+
+class ScoreChanged(GameEvent):
+    __slots__ = ()
+
+
+class PeriodChanged(GameEvent):
+    __slots__ = ()
+
+
+class EnteredClutchWindow(GameEvent):
+    """比赛开始满足提醒条件"""
+    __slots__ = ()
+
+
+class LeftClutchWindow(GameEvent):
+    """比赛不再满足提醒条件"""
+    __slots__ = ()
+
+
+class GameFinal(GameEvent):
+    """比赛结束"""
+    __slots__ = ()
+
+
+def is_final(game):
+    return '结束' in (game.status or '')
+
+
+class ChangeCapture:
+    """比较相邻两次快照生成事件；is_clutch(game) 判断比赛是否满足提醒条件"""
+
+    def __init__(self, is_clutch=None):
+        self.is_clutch = is_clutch
+        self.games = {}  # 比赛标识 -> (上一次快照中的 Game, 状态元组)
+        self.clutch = set()  # 上一次快照中满足提醒条件的比赛
+
+    def diff(self, games):
+        """返回本次快照相对上一次的事件列表（未变化的比赛不产生事件）"""
+        current = {}
+        events = []
+        clutch = set()
+        for game in map(Game.coerce, games):
+            # 与 poll_scheduler.game_key 相同，直接取属性避免字典式访问的开销
+            key = (game.team1, game.team2)
+            state = (game.score1, game.score2, game.period, game.clock, game.status)
+            current[key] = (game, state)
+            last = self.games.get(key)
+            if last is not None and last[1] == state:
+                if key in self.clutch:
+                    clutch.add(key)
+                continue
+
+            previous = None if last is None else last[0]
+            in_clutch = self.is_clutch is not None and self.is_clutch(game)
+            if in_clutch:
+                clutch.add(key)
+            if previous is None:
+                events.append(GameAdded(game))
+            else:
+                if (previous.score1, previous.score2) != (game.score1, game.score2):
+                    events.append(ScoreChanged(game, previous))
+                if previous.period != game.period:
+                    events.append(PeriodChanged(game, previous))
+            if in_clutch and key not in self.clutch:
+                events.append(EnteredClutchWindow(game, previous))
+            elif not in_clutch and key in self.clutch:
+                events.append(LeftClutchWindow(game, previous))
+            if is_final(game) and (previous is None or not is_final(previous)):
+                events.append(GameFinal(game, previous))
+            if previous is not None:
+                events.append(GameUpdated(game, previous))
+
+        for key in self.games.keys() - current.keys():
+            events.append(GameRemoved(self.games[key][0]))
+        self.games = current
+        self.clutch = clutch
+        return events
+
+
+class EventBus:
+    """进程内的事件发布/订阅；订阅某个事件类型也会收到它的子类事件，订阅 GameEvent 收到全部事件
+
+    处理函数在发布者的线程中同步调用，出错只写日志，不影响其他订阅者
+    """
+
+    def __init__(self):
+        self._handlers = {}  # 事件类型 -> [处理函数]
+        self._dispatch = {}  # 具体事件类型 -> 处理函数元组（按继承关系展开的缓存）
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type, handler):
+        """订阅事件，返回取消订阅的函数"""
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+            self._dispatch.clear()
+
+        def unsubscribe():
+            with self._lock:
+                handlers = self._handlers.get(event_type, [])
+                if handler in handlers:
+                    handlers.remove(handler)
+                self._dispatch.clear()
+        return unsubscribe
+
+    def _handlers_for(self, event_type):
+        handlers = self._dispatch.get(event_type)
+        if handlers is None:
+            with self._lock:
+                handlers = tuple(handler for cls in event_type.__mro__
+                                 for handler in self._handlers.get(cls, ()))
+                self._dispatch[event_type] = handlers
+        return handlers
+
+    def publish(self, event):
+        for handler in self._handlers_for(type(event)):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"处理事件 {type(event).__name__} 出错: {e}", exc_info=True)
+
+    def publish_all(self, events):
+        for event in events:
+            self.publish(event)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛页面解析后端
+提供基于lxml/XPath的快速解析引擎和基于BeautifulSoup的兼容引擎，
+两者输出完全相同的比赛记录（game_record.Game）；启动时自动选择可用的最快引擎
+"""
+
+import hashlib
+import importlib.util
+import logging
+import re
+
+from game_record import Game, Period
+
+logger = logging.getLogger(__name__)
+
+# lxml 在创建解析引擎时才导入
+LXML_AVAILABLE = importlib.util.find_spec('lxml') is not None
+
+PERIOD_PATTERN = re.compile(r'(第[一二三四]节|加时(?:赛)?)')
+TIME_PATTERN = re.compile(r'剩\s*(\d{1,2}):(\d{2})')
+# 比赛盒子中数据直播/文字直播链接里的比赛编号
+GAME_NO_PATTERN = re.compile(rb'/games/(?:boxscore|playbyplay)/(\d+)')
+
+
+def parse_period_time_text(period_time_text):
+    """解析节次和剩余时间文本（如 "第一节剩4:45"、"第二节结束"），返回 (period, time_remaining)"""
+    period = None
+    time_remaining = None
+
+    period_match = PERIOD_PATTERN.search(period_time_text)
+    if period_match:
+        period_str = period_match.group(0)
+        if '第四节' in period_str:
+            period = Period.Q4
+        elif '第三节' in period_str:
+            period = Period.Q3
+        elif '第二节' in period_str:
+            period = Period.Q2
+        elif '第一节' in period_str:
+            period = Period.Q1
+        elif '加时' in period_str:
+            period = Period.OT
+
+    time_match = TIME_PATTERN.search(period_time_text)
+    if time_match:
+        minutes = int(time_match.group(1))
+        seconds = int(time_match.group(2))
+        if 0 <= minutes <= 12 and 0 <= seconds < 60:
+            time_remaining = minutes * 60 + seconds
+    elif '结束' in period_time_text:
+        # 如果是"结束"，剩余时间为0
+        time_remaining = 0
+
+    return period, time_remaining
+
+
+class ParserBackend:
+    """解析引擎基类：find_boxes 找出所有比赛盒子，extract 从单个盒子提取比赛记录"""
+
+    name = None
+
+    def find_boxes(self, html):
+        raise NotImplementedError
+
+    def extract(self, box):
+        raise NotImplementedError
+
+    def markup(self, box):
+        """比赛盒子的原始标记，用于计算内容指纹；返回None表示该引擎不使用盒子缓存"""
+        return None
+
+
+class SoupParserBackend(ParserBackend):
+    """BeautifulSoup引擎（html.parser），无需额外依赖"""
+
+    name = 'bs4'
+
+    def find_boxes(self, html):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        # 虎扑NBA比赛结构：每个比赛在 <div class="list_box"> 中
+        return soup.find_all('div', class_='list_box')
+
+    # 不提供 markup()：str(box) 序列化比重新提取还慢（真实页面 7 个盒子约 17ms 对 3.7ms），不使用盒子缓存
+
+    def extract(self, box):
+        game = Game()
+
+        try:
+            # 提取球队信息和比分
+            team_vs_a = box.find('div', class_='team_vs_a')
+            if not team_vs_a:
+                return None
+
+            for side, cls in (('1', 'team_vs_a_1'), ('2', 'team_vs_a_2')):
+                team_a = team_vs_a.find('div', class_=cls)
+                if not team_a:
+                    continue
+                # 球队名称 - 在 div.txt > span > a 中
+                txt_div = team_a.find('div', class_='txt')
+                if not txt_div:
+                    continue
+                team_link = txt_div.find('a')
+                if team_link:
+                    setattr(game, 'team' + side, team_link.get_text(strip=True))
+
+                # 比分 - 在 span.num 中
+                score_elem = txt_div.find('span', class_='num')
+                if score_elem:
+                    try:
+                        setattr(game, 'score' + side, int(score_elem.get_text(strip=True)))
+                    except ValueError:
+                        pass
+
+            # 提取比赛状态和时间信息
+            team_vs_c = box.find('div', class_='team_vs_c')
+            if team_vs_c:
+                status_elem = team_vs_c.find('span', class_='b')
+                if status_elem:
+                    game.status = status_elem.get_text(strip=True)
+                    period_time_p = status_elem.find('p')
+                    if period_time_p:
+                        game.period, game.clock = \
+                            parse_period_time_text(period_time_p.get_text(strip=True))
+
+            # 如果至少有了比分，返回游戏信息
+            if game.score1 is not None and game.score2 is not None:
+                return game
+
+        except Exception as e:
+            logger.debug(f"提取比赛数据出错: {e}")
+
+        return None
+
+
+def _class_xpath(tag, cls, prefix='.//'):
+    """按class中的单个类名匹配元素的XPath（与BeautifulSoup的class_匹配语义一致）"""
+    from lxml import etree
+    return etree.XPath(
+        f"{prefix}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+    )
+
+
+class LxmlParserBackend(ParserBackend):
+    """lxml/XPath引擎，解析速度远高于html.parser"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+        self._etree = etree
+        self._parser = etree.HTMLParser()
+        self._boxes = _class_xpath('div', 'list_box', prefix='//')
+        self._team_vs_a = _class_xpath('div', 'team_vs_a')
+        self._team_vs_a_n = {
+            '1': _class_xpath('div', 'team_vs_a_1'),
+            '2': _class_xpath('div', 'team_vs_a_2'),
+        }
+        self._txt = _class_xpath('div', 'txt')
+        self._link = etree.XPath('.//a')
+        self._num = _class_xpath('span', 'num')
+        self._team_vs_c = _class_xpath('div', 'team_vs_c')
+        self._status = _class_xpath('span', 'b')
+        self._p = etree.XPath('.//p')
+        self._texts = etree.XPath('.//text()')
+
+    def _text(self, elem):
+        """等价于BeautifulSoup的 get_text(strip=True)"""
+        return ''.join(s.strip() for s in self._texts(elem))
+
+    def find_boxes(self, html):
+        root = self._etree.fromstring(html, self._parser)
+        if root is None:
+            return []
+        return self._boxes(root)
+
+    def markup(self, box):
+        # with_tail=False：盒子后面的空白不影响指纹
+        return self._etree.tostring(box, with_tail=False)
+
+    def extract(self, box):
+        game = Game()
+
+        try:
+            team_vs_a = self._team_vs_a(box)
+            if not team_vs_a:
+                return None
+            team_vs_a = team_vs_a[0]
+
+            for side, find_team in self._team_vs_a_n.items():
+                team_a = find_team(team_vs_a)
+                if not team_a:
+                    continue
+                txt_div = self._txt(team_a[0])
+                if not txt_div:
+                    continue
+                txt_div = txt_div[0]
+                team_link = self._link(txt_div)
+                if team_link:
+                    setattr(game, 'team' + side, self._text(team_link[0]))
+
+                score_elem = self._num(txt_div)
+                if score_elem:
+                    try:
+                        setattr(game, 'score' + side, int(self._text(score_elem[0])))
+                    except ValueError:
+                        pass
+
+            team_vs_c = self._team_vs_c(box)
+            if team_vs_c:
+                status_elem = self._status(team_vs_c[0])
+                if status_elem:
+                    status_elem = status_elem[0]
+                    game.status = self._text(status_elem)
+                    period_time_p = self._p(status_elem)
+                    if period_time_p:
+                        game.period, game.clock = \
+                            parse_period_time_text(self._text(period_time_p[0]))
+
+            if game.score1 is not None and game.score2 is not None:
+                return game
+
+        except Exception as e:
+            logger.debug(f"提取比赛数据出错: {e}")
+
+        return None
+
+
+class BoxCache:
+    """按比赛缓存提取结果：两次轮询之间内容指纹未变化的盒子直接复用上次的比赛记录
+
+    以盒子中的比赛编号为键（没有编号时用指纹），内容变化时覆盖该比赛的旧结果；
+    解析引擎的 markup() 返回None时直接提取，不查缓存
+    """
+
+    def __init__(self):
+        self.entries = {}  # 比赛编号 -> (内容指纹, 提取结果（可能为None）)
+        self.hits = 0
+        self.misses = 0
+        self.last_hits = 0
+        self.last_misses = 0
+
+    def extract_all(self, parser, boxes):
+        """提取所有盒子的比赛数据，只重新解析内容变化过的盒子；返回与boxes一一对应的结果"""
+        entries = {}
+        results = []
+        hits = misses = 0
+        for box in boxes:
+            markup = parser.markup(box)
+            if markup is None:
+                results.append(parser.extract(box))
+                continue
+            fingerprint = hashlib.blake2b(markup, digest_size=16).digest()
+            match = GAME_NO_PATTERN.search(markup)
+            key = match.group(1) if match else fingerprint
+            cached = entries.get(key) or self.entries.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                game_info = cached[1]
+                hits += 1
+            else:
+                game_info = parser.extract(box)
+                misses += 1
+            entries[key] = (fingerprint, game_info)
+            results.append(game_info)
+
+        # 只保留本次页面中仍然存在的比赛，缓存大小不超过页面上的比赛数
+        self.entries = entries
+        self.last_hits = hits
+        self.last_misses = misses
+        self.hits += hits
+        self.misses += misses
+        return results
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.entries = {}
+
+
+# 按解析速度从快到慢排列
+BACKENDS = {}
+if LXML_AVAILABLE:
+    BACKENDS[LxmlParserBackend.name] = LxmlParserBackend
+BACKENDS[SoupParserBackend.name] = SoupParserBackend
+
+
+def get_parser_backend(name=None):
+    """获取解析引擎；未指定名称时返回可用的最快引擎"""
+    if name is None:
+        name = next(iter(BACKENDS))
+    if name not in BACKENDS:
+        raise ValueError(f"解析引擎不可用: {name}（可用: {', '.join(BACKENDS)}）")
+    backend = BACKENDS[name]()
+    logger.debug(f"使用解析引擎: {backend.name}")
+    return backend
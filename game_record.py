@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛记录类型
+使用 __slots__ 的紧凑比赛记录，节次为小型枚举，剩余时间为整数秒；
+同时保留字典式访问（game.get('score1') / game['period']），便于旧代码逐步迁移
+"""
+
+from enum import IntEnum
+
+
+class Period(IntEnum):
+    """比赛节次"""
+
+    Q1 = 1
+    Q2 = 2
+    Q3 = 3
+    Q4 = 4
+    OT = 5
+
+    def __str__(self):
+        return self.name
+
+    def __format__(self, spec):
+        return format(self.name, spec)
+
+    @classmethod
+    def parse(cls, label):
+        """将 'Q4'、'OT' 等标签转换为 Period，无法识别时返回None"""
+        if label is None or isinstance(label, Period):
+            return label
+        return cls.__members__.get(str(label).strip().upper())
+
+
+class Game:
+    """单场比赛的一次快照"""
+
+    __slots__ = ('team1', 'team2', 'score1', 'score2', 'period', 'clock', 'status')
+
+    # 字典式访问时的键名 -> 属性名（time_remaining 为旧字典中的剩余时间键）
+    _KEYS = {
+        'team1': 'team1',
+        'team2': 'team2',
+        'score1': 'score1',
+        'score2': 'score2',
+        'period': 'period',
+        'time_remaining': 'clock',
+        'status': 'status',
+    }
+
+    def __init__(self, team1=None, team2=None, score1=None, score2=None,
+                 period=None, clock=None, status=None):
+        self.team1 = team1
+        self.team2 = team2
+        self.score1 = score1
+        self.score2 = score2
+        self.period = period  # Period 或 None
+        self.clock = clock  # 本节剩余时间（秒）或 None
+        self.status = status
+
+    @classmethod
+    def from_dict(cls, data):
+        """从旧的比赛字典创建"""
+        return cls(data.get('team1'), data.get('team2'), data.get('score1'), data.get('score2'),
+                   Period.parse(data.get('period')), data.get('time_remaining'), data.get('status'))
+
+    @classmethod
+    def coerce(cls, game):
+        """接受 Game 或旧的比赛字典，统一返回 Game"""
+        return game if isinstance(game, cls) else cls.from_dict(game)
+
+    def to_dict(self):
+        """转换为旧的比赛字典格式"""
+        return {key: self.get(key) for key in self._KEYS}
+
+    # ---- 字典兼容接口 ----
+
+    def get(self, key, default=None):
+        attr = self._KEYS.get(key)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        if attr == 'period' and value is not None:
+            return value.name
+        return value
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def keys(self):
+        return self._KEYS.keys()
+
+    # ---- 常用派生属性 ----
+
+    @property
+    def time_remaining(self):
+        return self.clock
+
+    @property
+    def score_diff(self):
+        return abs(self.score1 - self.score2)
+
+    @property
+    def is_late(self):
+        """是否处于第四节或加时赛"""
+        return self.period is not None and self.period >= Period.Q4
+
+    def __eq__(self, other):
+        if not isinstance(other, Game):
+            return NotImplemented
+        return all(getattr(self, attr) == getattr(other, attr) for attr in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Game({self.team1!r} {self.score1}-{self.score2} {self.team2!r}, "
+                f"{self.period}, clock={self.clock})")
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛快照录制与回放
+录制：把每次解析得到的比赛快照连同时间戳写入紧凑的列式文件；
+回放：按 1x~1000x 速度（或不限速）把快照重新送入检测和提醒逻辑，
+用于离线测量端到端检测延迟、吞吐量，以及用历史比赛调整提醒阈值
+
+用法:
+    python nba_game_reminder.py --record games.rec                 # 运行时录制
+    python game_recording.py info games.rec
+    python game_recording.py replay games.rec --speed 100 --threshold 90 --diff 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+
+from game_record import Game, Period
+from notification_dispatcher import NotificationDispatcher
+from notification_store import NotificationStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NBAREC1\n'
+_CHUNK_HEADER = struct.Struct('<I')
+
+# 列名 -> array类型码；None 用 -1 表示，字符串列存放字符串表中的下标
+COLUMNS = (
+    ('snapshot', 'I'),  # 快照序号
+    ('ts', 'd'),  # 快照时间戳（Unix秒）
+    ('team1', 'i'),
+    ('team2', 'i'),
+    ('score1', 'h'),
+    ('score2', 'h'),
+    ('period', 'b'),
+    ('clock', 'h'),
+    ('status', 'i'),
+)
+
+# 文件中的数组统一使用小端字节序
+_SWAP = sys.byteorder != 'little'
+
+
+def _new_columns():
+    return {name: array(code) for name, code in COLUMNS}
+
+
+class SnapshotRecorder:
+    """按列缓存快照，每 flush_rows 行压缩写入一个数据块（只追加）"""
+
+    def __init__(self, path, flush_rows=1024):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.strings = {}  # 字符串 -> 下标
+        self._new_strings = []  # 自上次写入以来新增的字符串
+        self.columns = _new_columns()
+        self.snapshots = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # 继续录制已有文件：恢复字符串表和快照序号
+            good_end = len(MAGIC)
+            for columns, new_strings, good_end in _read_chunks(path):
+                for value in new_strings:
+                    self.strings[value] = len(self.strings)
+                if columns['snapshot']:
+                    self.snapshots = columns['snapshot'][-1] + 1
+            if os.path.getsize(path) > good_end:
+                # 上次写入中断留下的残缺数据块：截掉，否则之后追加的数据块读取时会被一起忽略
+                logger.warning(f"录制文件末尾有 {os.path.getsize(path) - good_end} 字节残缺数据，已截断: {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(good_end)
+        else:
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+
+    def _intern(self, value):
+        if value is None:
+            return -1
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+            self._new_strings.append(value)
+        return index
+
+    def record(self, games, ts=None):
+        """记录一次快照"""
+        ts = time.time() if ts is None else ts
+        cols = self.columns
+        snapshot = self.snapshots
+        for game in map(Game.coerce, games):
+            cols['snapshot'].append(snapshot)
+            cols['ts'].append(ts)
+            cols['team1'].append(self._intern(game.team1))
+            cols['team2'].append(self._intern(game.team2))
+            cols['score1'].append(-1 if game.score1 is None else game.score1)
+            cols['score2'].append(-1 if game.score2 is None else game.score2)
+            cols['period'].append(-1 if game.period is None else int(game.period))
+            cols['clock'].append(-1 if game.clock is None else game.clock)
+            cols['status'].append(self._intern(game.status))
+        if not games:
+            # 空快照也要保留时间点，用 team1=-2 的占位行表示
+            for name, _ in COLUMNS:
+                cols[name].append({'snapshot': snapshot, 'ts': ts, 'team1': -2}.get(name, -1))
+        self.snapshots += 1
+        if len(cols['snapshot']) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """把缓存的行写成一个压缩数据块"""
+        rows = len(self.columns['snapshot'])
+        if not rows:
+            return
+        header = json.dumps({'rows': rows, 'strings': self._new_strings},
+                            ensure_ascii=False).encode('utf-8')
+        if _SWAP:
+            for column in self.columns.values():
+                column.byteswap()
+        payload = b''.join([_CHUNK_HEADER.pack(len(header)), header]
+                           + [self.columns[name].tobytes() for name, _ in COLUMNS])
+        data = zlib.compress(payload, 6)
+        with open(self.path, 'ab') as f:
+            f.write(_CHUNK_HEADER.pack(len(data)) + data)
+        self.columns = _new_columns()
+        self._new_strings = []
+
+    def close(self):
+        self.flush()
+
+
+def _iter_chunks(path):
+    """逐块读取，返回每块的 (列字典, 新增字符串)"""
+    for columns, new_strings, _ in _read_chunks(path):
+        yield columns, new_strings
+
+
+def _read_chunks(path):
+    """逐块读取，返回每块的 (列字典, 新增字符串, 该块结束的文件偏移)；遇到残缺数据块时停止"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是比赛录制文件: {path}")
+        while True:
+            size = f.read(_CHUNK_HEADER.size)
+            if len(size) < _CHUNK_HEADER.size:
+                return
+            data = f.read(_CHUNK_HEADER.unpack(size)[0])
+            try:
+                payload = zlib.decompress(data)
+            except zlib.error:
+                # 写入中断的残缺数据块
+                logger.warning(f"录制文件末尾数据块损坏，已忽略: {path}")
+                return
+            header_len = _CHUNK_HEADER.unpack_from(payload)[0]
+            offset = _CHUNK_HEADER.size + header_len
+            header = json.loads(payload[_CHUNK_HEADER.size:offset])
+            columns = {}
+            for name, code in COLUMNS:
+                column = array(code)
+                nbytes = header['rows'] * column.itemsize
+                column.frombytes(payload[offset:offset + nbytes])
+                if _SWAP:
+                    column.byteswap()
+                offset += nbytes
+                columns[name] = column
+            yield columns, header['strings'], f.tell()
+
+
+def read_snapshots(path):
+    """按顺序读取录制文件，逐个返回 (ts, [Game, ...])"""
+    strings = []
+    current = None
+    current_ts = None
+    games = []
+
+    def text(index):
+        return strings[index] if index >= 0 else None
+
+    for cols, new_strings in _iter_chunks(path):
+        strings.extend(new_strings)
+        for i in range(len(cols['snapshot'])):
+            snapshot = cols['snapshot'][i]
+            if snapshot != current:
+                if current is not None:
+                    yield current_ts, games
+                current, current_ts, games = snapshot, cols['ts'][i], []
+            if cols['team1'][i] == -2:
+                continue
+            games.append(Game(
+                text(cols['team1'][i]), text(cols['team2'][i]),
+                None if cols['score1'][i] < 0 else cols['score1'][i],
+                None if cols['score2'][i] < 0 else cols['score2'][i],
+                None if cols['period'][i] < 0 else Period(cols['period'][i]),
+                None if cols['clock'][i] < 0 else cols['clock'][i],
+                text(cols['status'][i]),
+            ))
+    if current is not None:
+        yield current_ts, games
+
+
+class ReplayDriver:
+    """把录制的快照按指定倍速送入提醒器的处理流程（reminder.process_games，与实时轮询相同）
+
+    回放期间使用临时的提醒记录和一个按快照时间计时的通知队列（合并窗口、优先级、丢弃与实时相同），
+    每个快照处理完后等待队列发送完；不录制快照，send_notifications 为False时不发送真实通知
+    """
+
+    def __init__(self, reminder, speed=1.0, send_notifications=False):
+        self.reminder = reminder
+        self.speed = speed  # 回放倍速；0 表示不等待，尽可能快
+        self.send_notifications = send_notifications
+
+    def run(self, path):
+        """回放录制文件，返回统计结果字典"""
+        reminder = self.reminder
+        alerts = []
+        latencies = []
+        snapshots = 0
+        games_total = 0
+        processing = 0.0
+        current = {'ts': 0.0, 'due': 0.0}  # 正在处理的快照时间和它应到达的时刻
+
+        def send(game):
+            # 快照时间是录制时的时间，回放的检测延迟在这里另行统计，不计入实时指标
+            reminder.condition_first_met.pop(reminder.get_game_key(game), None)
+            sent = reminder.send_notification(game) if self.send_notifications else True
+            # 检测延迟：从快照应到达的时刻到提醒发出（真实时间）
+            latency = time.perf_counter() - current['due']
+            latencies.append(latency)
+            alerts.append({'ts': current['ts'], 'game_id': reminder.get_game_id(game), 'latency_s': latency})
+            return sent
+
+        # 使用临时的提醒记录，不影响真实的提醒状态；回放的快照不写回录制文件
+        saved = (reminder.notification_store, reminder.dispatcher, reminder.recorder)
+        live = reminder.dispatcher
+        with tempfile.TemporaryDirectory() as tmp:
+            reminder.notification_store = NotificationStore(os.path.join(tmp, 'replay.jsonl'))
+            reminder.dispatcher = NotificationDispatcher(send, workers=1, maxsize=live.maxsize,
+                                                         coalesce_window=live.coalesce_window,
+                                                         on_drop=live.on_drop, clock=lambda: current['ts'])
+            reminder.recorder = None
+            try:
+                start_wall = time.perf_counter()
+                start_ts = None
+                elapsed = 0.0
+                for ts, games in read_snapshots(path):
+                    if start_ts is None:
+                        start_ts = ts
+                    began = time.perf_counter()
+                    due = began
+                    if self.speed:
+                        # 等到该快照在回放时间线上的时刻
+                        due = start_wall + (ts - start_ts) / self.speed
+                        if due > began:
+                            time.sleep(due - began)
+                        began = time.perf_counter()
+
+                    current['ts'], current['due'] = ts, due
+                    reminder.ingest(games, now=ts)
+                    reminder.process_games(games)
+                    reminder.dispatcher.join()
+                    processing += time.perf_counter() - began
+                    snapshots += 1
+                    games_total += len(games)
+                elapsed = time.perf_counter() - start_wall
+            finally:
+                reminder.dispatcher.close()
+                reminder.notification_store, reminder.dispatcher, reminder.recorder = saved
+
+        latencies.sort()
+        return {
+            'speed': self.speed,
+            'snapshots': snapshots,
+            'games': games_total,
+            'alerts': alerts,
+            'elapsed_s': elapsed,
+            'processing_s': processing,
+            'snapshots_per_sec': snapshots / processing if processing else 0.0,
+            'games_per_sec': games_total / processing if processing else 0.0,
+            'latency_p50_s': latencies[len(latencies) // 2] if latencies else None,
+            'latency_max_s': latencies[-1] if latencies else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比赛快照录制文件的查看与回放")
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help="显示录制文件概况")
+    info.add_argument('path')
+    replay = sub.add_parser('replay', help="回放录制文件")
+    replay.add_argument('path')
+    replay.add_argument('--speed', type=float, default=0, help="回放倍速（1~1000），0表示不限速")
+    replay.add_argument('--threshold', type=int, help="剩余时间阈值（秒），覆盖默认值")
+    replay.add_argument('--diff', type=int, help="分差阈值，覆盖默认值")
+    replay.add_argument('--notify', action='store_true', help="回放时发送真实通知")
+    replay.add_argument('--json', help="将统计结果保存为JSON文件")
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        snapshots = games = 0
+        first = last = None
+        for ts, snapshot_games in read_snapshots(args.path):
+            first = ts if first is None else first
+            last = ts
+            snapshots += 1
+            games += len(snapshot_games)
+        print(f"快照: {snapshots} | 比赛记录: {games} | 文件大小: {os.path.getsize(args.path)} 字节")
+        if first is not None:
+            print(f"时间跨度: {last - first:.0f} 秒")
+        return 0
+
+    from nba_game_reminder import NBAGameReminder
+    reminder = NBAGameReminder()
+    if args.threshold is not None:
+        reminder.TIME_THRESHOLD = args.threshold
+    if args.diff is not None:
+        reminder.SCORE_DIFF_THRESHOLD = args.diff
+    logging.getLogger().setLevel(logging.WARNING)
+
+    result = ReplayDriver(reminder, args.speed, args.notify).run(args.path)
+    print(f"回放 {result['snapshots']} 个快照 / {result['games']} 条比赛记录，"
+          f"用时 {result['elapsed_s']:.2f} 秒，处理吞吐 {result['snapshots_per_sec']:.0f} 快照/秒")
+    if result['alerts']:
+        print(f"提醒 {len(result['alerts'])} 次，检测延迟 p50={result['latency_p50_s'] * 1000:.2f}ms "
+              f"最大={result['latency_max_s'] * 1000:.2f}ms")
+    else:
+        print("没有触发提醒")
+    for alert in result['alerts']:
+        print(f"  {alert['game_id']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+比赛比分时间线
+每场比赛一个固定容量的环形缓冲区（array 模块的定长数组），保存 (时间, 节次, 剩余时间, 比分1, 比分2) 采样，
+只在比赛状态变化时追加，每场比赛占用的内存固定；
+领先易主、追平和得分攻势（一方连续得分）由增量状态在追加时 O(1) 检测，只在最后几分钟提醒
+"""
+
+import time
+from array import array
+
+from game_record import Game, Period
+from poll_scheduler import game_key
+
+# 事件类型
+LEAD_CHANGE = 'lead_change'  # 领先易主
+TIE = 'tie'  # 追平
+RUN = 'run'  # 一方连续得分（对手未得分）
+
+_EVENT_NAMES = {LEAD_CHANGE: '领先易主', TIE: '比分追平', RUN: '得分攻势'}
+
+
+class TimelineEvent:
+    """时间线检测到的一次比赛事件；run 为攻势中连续得分的球队和分数"""
+
+    __slots__ = ('kind', 'game', 'team', 'points')
+
+    def __init__(self, kind, game, team=None, points=0):
+        self.kind = kind
+        self.game = game
+        self.team = team
+        self.points = points
+
+    def describe(self):
+        game = self.game
+        text = f"{_EVENT_NAMES[self.kind]}: {game.team1} {game.score1} - {game.score2} {game.team2}"
+        if self.kind == RUN:
+            text += f"（{self.team} 连得 {self.points} 分）"
+        elif self.kind == LEAD_CHANGE:
+            text += f"（{self.team} 反超）"
+        return text
+
+    def to_dict(self):
+        return {'kind': self.kind, 'game': self.game.to_dict(), 'team': self.team, 'points': self.points}
+
+    def __repr__(self):
+        return f"TimelineEvent({self.kind!r}, {self.game!r}, team={self.team!r}, points={self.points})"
+
+
+class GameTimeline:
+    """一场比赛的环形采样缓冲区和增量检测状态"""
+
+    __slots__ = ('capacity', '_time', '_period', '_clock', '_score1', '_score2', '_start', '_size',
+                 'leader', 'run_team', 'run_points', 'run_reported')
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self._time = array('d', bytes(8 * capacity))
+        self._period = array('b', bytes(capacity))
+        self._clock = array('h', bytes(2 * capacity))
+        self._score1 = array('H', bytes(2 * capacity))
+        self._score2 = array('H', bytes(2 * capacity))
+        self._start = 0
+        self._size = 0
+        self.leader = 0  # 最近一次有领先方时：1 球队1，2 球队2，0 尚未有人领先
+        self.run_team = 0  # 正在连续得分的球队（1/2），0 表示没有
+        self.run_points = 0
+        self.run_reported = False  # 本次攻势是否已经提醒过
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, period, clock, score1, score2):
+        """追加一个采样（缓冲区满时覆盖最旧的采样）"""
+        index = (self._start + self._size) % self.capacity
+        if self._size == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+        self._time[index] = timestamp
+        self._period[index] = period
+        self._clock[index] = clock
+        self._score1[index] = score1
+        self._score2[index] = score2
+
+    def last(self):
+        """最新的采样 (时间, 节次, 剩余时间, 比分1, 比分2)，没有采样时返回None"""
+        if not self._size:
+            return None
+        return self._sample((self._start + self._size - 1) % self.capacity)
+
+    def samples(self):
+        """从旧到新返回全部采样"""
+        return [self._sample((self._start + i) % self.capacity) for i in range(self._size)]
+
+    def _sample(self, index):
+        return (self._time[index], self._period[index], self._clock[index],
+                self._score1[index], self._score2[index])
+
+
+class TimelineTracker:
+    """为页面上的每场比赛维护时间线，并检测最后几分钟的领先易主、追平和得分攻势
+
+    capacity      每场比赛保留的采样数
+    run_threshold 一方连续得分达到该分数时提醒一次
+    final_window  第四节/加时剩余时间不超过该秒数时才提醒
+    """
+
+    def __init__(self, capacity=64, run_threshold=8, final_window=300):
+        self.capacity = capacity
+        self.run_threshold = run_threshold
+        self.final_window = final_window
+        self.timelines = {}  # 比赛标识 -> GameTimeline
+
+    def __len__(self):
+        return len(self.timelines)
+
+    def get(self, game):
+        return self.timelines.get(game_key(game))
+
+    def update(self, games, now=None):
+        """追加一次快照，返回检测到的事件；不再出现的比赛被移除"""
+        now = time.time() if now is None else now
+        previous, self.timelines = self.timelines, {}
+        events = []
+        for game in map(Game.coerce, games):
+            if game.score1 is None or game.score2 is None:
+                continue
+            key = game_key(game)
+            timeline = previous.get(key)
+            if timeline is None:
+                timeline = GameTimeline(self.capacity)
+            self.timelines[key] = timeline
+            self._advance(timeline, game, now, events)
+        return events
+
+    def _advance(self, timeline, game, now, events):
+        period = 0 if game.period is None else int(game.period)
+        clock = -1 if game.clock is None else game.clock
+        last = timeline.last()
+        if last is not None and last[1:] == (period, clock, game.score1, game.score2):
+            return
+        timeline.append(now, period, clock, game.score1, game.score2)
+
+        diff = game.score1 - game.score2
+        leader = 1 if diff > 0 else 2 if diff < 0 else 0
+        final = (game.period is not None and game.period >= Period.Q4
+                 and game.clock is not None and game.clock <= self.final_window)
+
+        if last is not None:
+            gained1, gained2 = game.score1 - last[3], game.score2 - last[4]
+            if gained1 < 0 or gained2 < 0:
+                # 比分被更正，重新开始统计
+                timeline.run_team, timeline.run_points, timeline.run_reported = 0, 0, False
+            elif gained1 and gained2:
+                # 两次采样之间双方都得分，无法判断先后，攻势中断
+                timeline.run_team, timeline.run_points, timeline.run_reported = 0, 0, False
+            elif gained1 or gained2:
+                scorer = 1 if gained1 else 2
+                if scorer != timeline.run_team:
+                    timeline.run_team, timeline.run_points, timeline.run_reported = scorer, 0, False
+                timeline.run_points += gained1 or gained2
+                if final and not timeline.run_reported and timeline.run_points >= self.run_threshold:
+                    timeline.run_reported = True
+                    team = game.team1 if scorer == 1 else game.team2
+                    events.append(TimelineEvent(RUN, game, team, timeline.run_points))
+
+            if final and leader == 0 and last[3] != last[4]:
+                events.append(TimelineEvent(TIE, game))
+            elif final and leader and timeline.leader and leader != timeline.leader:
+                events.append(TimelineEvent(LEAD_CHANGE, game, game.team1 if leader == 1 else game.team2))
+
+        if leader:
+            timeline.leader = leader
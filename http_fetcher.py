@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+页面抓取层
+使用持久化的keep-alive会话、压缩传输和ETag/If-Modified-Since条件请求获取比赛页面，
+并记录每次请求各阶段（连接、首字节、正文）的耗时
+"""
+
+import functools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 记录当前线程最近一次建立TCP/TLS连接的耗时（连接复用时保持为0）
+_phase = threading.local()
+
+
+@functools.lru_cache(maxsize=None)
+def _timed_adapter_class():
+    """构造使用计时连接池的适配器类（requests/urllib3 在第一次创建抓取器时才导入）"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _TimedHTTPConnection(HTTPConnection):
+        """记录连接建立耗时的HTTP连接"""
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            _phase.connect = getattr(_phase, 'connect', 0.0) + time.perf_counter() - start
+
+    class _TimedHTTPSConnection(HTTPSConnection):
+        """记录连接建立（含TLS握手）耗时的HTTPS连接"""
+
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            _phase.connect = getattr(_phase, 'connect', 0.0) + time.perf_counter() - start
+
+    class _TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TimedHTTPConnection
+
+    class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+    class TimedHTTPAdapter(HTTPAdapter):
+        """使用计时连接池的适配器"""
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': _TimedHTTPConnectionPool,
+                'https': _TimedHTTPSConnectionPool,
+            }
+
+    return TimedHTTPAdapter
+
+
+class FetchResult:
+    """单次抓取结果"""
+
+    __slots__ = ('status', 'text', 'not_modified', 'timings')
+
+    def __init__(self, status, text=None, not_modified=False, timings=None):
+        self.status = status  # HTTP状态码，请求失败时为None
+        self.text = text  # 页面内容，304或失败时为None
+        self.not_modified = not_modified  # 服务器返回304，页面未变化
+        self.timings = timings or {}  # 各阶段耗时（秒）：connect/ttfb/body/total
+
+    @property
+    def ok(self):
+        return self.text is not None or self.not_modified
+
+
+class PageFetcher:
+    """带连接复用和条件请求的页面抓取器"""
+
+    def __init__(self, url, headers=None, timeout=10, pool_maxsize=4):
+        self.url = url
+        self.headers = headers
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self._session = None  # 第一次请求时创建（导入requests）
+
+        # 条件请求的验证信息
+        self.etag = None
+        self.last_modified = None
+        self.last_timings = {}
+
+    @property
+    def session(self):
+        """复用连接的requests会话"""
+        if self._session is None:
+            import requests
+            from urllib3.util import make_headers
+            session = requests.Session()
+            adapter = _timed_adapter_class()(pool_connections=1, pool_maxsize=self.pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(make_headers(keep_alive=True, accept_encoding=True))
+            if self.headers:
+                session.headers.update(self.headers)
+            self._session = session
+        return self._session
+
+    def _conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def fetch(self, url=None):
+        """获取页面，返回FetchResult"""
+        session = self.session
+        from requests.exceptions import RequestException
+        _phase.connect = 0.0
+        start = time.perf_counter()
+        response = body = None
+        try:
+            response = session.get(
+                url or self.url,
+                headers=self._conditional_headers() if url is None else None,
+                timeout=self.timeout,
+                stream=True,
+            )
+            headers_at = time.perf_counter()
+            connect = _phase.connect
+            # 正文读完后连接才会放回连接池；304 和错误响应也要读取（通常为空），否则连接被关闭无法复用
+            body = response.content
+            done_at = time.perf_counter()
+
+            if response.status_code == 304:
+                timings = self._timings(start, connect, headers_at, done_at)
+                logger.debug(f"页面未变化(304)，耗时: {self._format_timings(timings)}")
+                return FetchResult(304, not_modified=True, timings=timings)
+
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            text = response.text
+
+            if url is None:
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+
+            timings = self._timings(start, connect, headers_at, done_at)
+            logger.debug(f"页面获取完成 ({len(text)} 字符)，耗时: {self._format_timings(timings)}")
+            return FetchResult(response.status_code, text=text, timings=timings)
+        except RequestException as e:
+            logger.error(f"获取比赛数据失败: {e}")
+            status = response.status_code if response is not None else None
+            if response is not None and body is None:
+                # 正文没有读完，连接状态未知，关闭而不是放回连接池
+                response.close()
+            return FetchResult(status, timings={'total': time.perf_counter() - start})
+
+    def _timings(self, start, connect, headers_at, done_at):
+        timings = {
+            'connect': connect,
+            'ttfb': max(headers_at - start - connect, 0.0),
+            'body': done_at - headers_at,
+            'total': done_at - start,
+        }
+        self.last_timings = timings
+        return timings
+
+    @staticmethod
+    def _format_timings(timings):
+        return ' '.join(f"{k}={v * 1000:.1f}ms" for k, v in timings.items())
+
+    def reset_validators(self):
+        """清除缓存的ETag/Last-Modified，强制下次完整获取"""
+        self.etag = None
+        self.last_modified = None
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日志配置
+轮询线程只把日志记录放入队列，由后台线程写入文件和控制台；
+日志文件按大小轮转，短时间内重复的相同警告/错误日志会被合并
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = 'nba_reminder.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """同一条 WARNING 及以上级别的日志（如网络故障时每次轮询的抓取失败）在 interval 秒内只输出一次
+
+    INFO 等级别不合并：不同比赛可能输出内容相同的日志，合并会丢失信息；
+    省略的条数在该日志下一次输出时补记；没有再出现时由 start() 启动的后台线程在间隔过后
+    （最迟两个间隔内）单独补记一条，程序退出时（flush）补记剩余的
+    """
+
+    def __init__(self, interval=60.0, max_keys=1024, level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self.level = level
+        self.emit = None  # 单独补记省略条数的输出函数（如 QueueHandler.emit），None 时只在下一次输出时补记
+        self._last = {}  # (logger, 级别, 消息) -> [上次输出时间, 期间省略的条数, 最近省略的记录]
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def filter(self, record):
+        if record.levelno < self.level or self.interval <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            pending = self._sweep(now) if now >= self._next_sweep else ()
+            entry = self._last.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                entry[2] = record
+                passed = False
+            else:
+                if entry is not None and entry[1]:
+                    record.msg = self._summary(record, entry[1])
+                    record.args = ()
+                if len(self._last) >= self.max_keys:
+                    self._last.clear()
+                self._last[key] = [now, 0, None]
+                passed = True
+        self._emit(pending)
+        return passed
+
+    def _summary(self, record, count):
+        return f"{record.getMessage()}（此前 {self.interval:.0f} 秒内省略 {count} 条重复日志）"
+
+    def _sweep(self, now, force=False):
+        # 调用方持有锁；取出已过间隔（force 时全部）且有省略条数的日志，生成补记记录
+        self._next_sweep = now + self.interval
+        pending = []
+        for key, entry in list(self._last.items()):
+            if not force and now - entry[0] < self.interval:
+                continue
+            if entry[1]:
+                summary = logging.makeLogRecord(entry[2].__dict__)
+                summary.msg = self._summary(entry[2], entry[1])
+                summary.args = ()
+                pending.append(summary)
+            del self._last[key]
+        return pending
+
+    def _emit(self, records):
+        if self.emit is None:
+            return
+        for record in records:
+            self.emit(record)
+
+    def start(self):
+        """启动后台线程，每 interval 秒补记一次已过间隔的省略条数（没有新日志时也能及时补记）"""
+        self._stopped.clear()
+        threading.Thread(target=self._run, name='nba-log-sweep', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                pending = self._sweep(time.monotonic())
+            self._emit(pending)
+
+    def flush(self):
+        """立即补记所有省略的条数（程序退出时调用）"""
+        with self._lock:
+            pending = self._sweep(time.monotonic(), force=True)
+        self._emit(pending)
+
+
+def setup_logging(path=LOG_FILE, level=logging.INFO, max_bytes=5 * 1024 * 1024, backup_count=3,
+                  rate_limit=60.0):
+    """配置根日志器：队列 + 后台写入线程，文件按 max_bytes 轮转并保留 backup_count 个备份
+
+    path 为None时只输出到控制台；重复调用时直接返回已启动的 QueueListener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if path is not None:
+        handlers.insert(0, RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    rate_filter = RateLimitFilter(rate_limit)
+    rate_filter.emit = queue_handler.emit
+    queue_handler.addFilter(rate_filter)
+    if rate_limit > 0:
+        rate_filter.start()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # 退出时先补记省略的重复日志条数，再把队列中剩余的日志写完（atexit 后注册的先执行）
+    atexit.register(_listener.stop)
+    atexit.register(rate_filter.flush)
+    atexit.register(rate_filter.stop)
+    return _listener
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+运行指标
+轻量的计数器/仪表/直方图实现，以Prometheus文本格式通过本地HTTP端点暴露，
+不依赖第三方库；主循环在抓取、解析、提醒各环节记录指标
+
+用法:
+    python nba_game_reminder.py --metrics-port 9108
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """按标签值取得子指标"""
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签: {', '.join(self.labelnames)}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} 需要标签: {', '.join(self.labelnames)}")
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _ValueChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """可任意设置的仪表"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, ('le', _format_value(bound)))} "
+                         f"{cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labelnames, values, ('le', '+Inf'))} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"指标已存在: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Prometheus文本格式"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+FETCH_DURATION = REGISTRY.histogram(
+    'nba_fetch_duration_seconds', "比赛页面抓取各阶段耗时", ('phase',))
+FETCH_REQUESTS = REGISTRY.counter(
+    'nba_fetch_requests_total', "比赛页面抓取次数（按结果）", ('status',))
+PARSE_DURATION = REGISTRY.histogram(
+    'nba_parse_duration_seconds', "parse_game_info 耗时")
+PARSE_GAMES = REGISTRY.gauge(
+    'nba_parse_games', "最近一次解析到的比赛数")
+BOX_CACHE = REGISTRY.counter(
+    'nba_box_cache_lookups_total', "比赛盒子缓存查询次数（按结果）", ('result',))
+NOTIFY_DURATION = REGISTRY.histogram(
+    'nba_notification_dispatch_seconds', "send_notification 耗时")
+NOTIFICATIONS = REGISTRY.counter(
+    'nba_notifications_total', "发送的通知数（按结果）", ('result',))
+NOTIFY_QUEUE_DEPTH = REGISTRY.gauge(
+    'nba_notification_queue_depth', "通知队列中等待发送的提醒数")
+NOTIFY_QUEUE_WAIT = REGISTRY.histogram(
+    'nba_notification_queue_wait_seconds', "提醒在通知队列中的等待时间")
+NOTIFY_QUEUE_EVENTS = REGISTRY.counter(
+    'nba_notification_queue_events_total', "通知队列事件数（queued/merged/coalesced/dropped）", ('event',))
+DETECTION_LAG = REGISTRY.histogram(
+    'nba_detection_lag_seconds', "比赛首次满足提醒条件到通知发出的时间",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """在后台线程启动指标HTTP服务，返回服务器对象（调用 shutdown() 停止）"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"指标请求: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='nba-metrics', daemon=True)
+    thread.start()
+    logger.info(f"指标端点已启动: http://{host}:{server.server_address[1]}/metrics")
+    return server
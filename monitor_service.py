@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+无界面监控服务
+检测核心作为独立的常驻进程运行（自己的轮询调度，不加载Kivy），通过本地套接字暴露比赛状态；
+手机/桌面界面只连接该套接字渲染比赛列表，检测延迟不受界面渲染影响
+
+协议: 客户端发送一行JSON命令 {"cmd": ...}，服务端以一行一个JSON回复
+    subscribe  持续推送事件 {"seq", "event", "data"}（snapshot/games/alert/alerts，与分发服务相同）和心跳 {"event": "ping"}；
+               可带 "subscriber": ID 绑定多用户订阅，只收到发给该用户的提醒
+    snapshot   当前全部比赛 {"games": [...]}
+    status     服务状态
+    refresh    立即检查一次 {"ok": true}
+
+地址: 文件路径表示Unix套接字；不支持Unix套接字的平台用 tcp:127.0.0.1:PORT
+
+用法:
+    python monitor_service.py run --socket nba_reminder.sock              # 启动服务
+    python monitor_service.py status --socket nba_reminder.sock           # 查询服务状态
+    NBA_REMINDER_SERVICE=nba_reminder.sock python main.py               # 界面连接服务
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from fanout_server import FanoutClient, GameHub
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = 'nba_reminder.sock'
+
+
+def parse_address(address):
+    """返回 (地址族, 地址)：'tcp:HOST:PORT' 为TCP，其余为Unix套接字路径"""
+    if address.startswith('tcp:'):
+        host, _, port = address[4:].rpartition(':')
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    if not hasattr(socket, 'AF_UNIX'):
+        raise ValueError(f"当前平台不支持Unix套接字，请使用 tcp:127.0.0.1:PORT 地址: {address}")
+    return socket.AF_UNIX, address
+
+
+def connect(address, timeout=5.0):
+    """连接监控服务，返回套接字"""
+    family, addr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(addr)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def send_command(address, cmd, timeout=5.0):
+    """发送一条命令并返回服务端的回复"""
+    with connect(address, timeout) as sock:
+        sock.sendall(json.dumps({'cmd': cmd}).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("监控服务未返回数据")
+    return json.loads(line)
+
+
+class _ServiceHandler(socketserver.StreamRequestHandler):
+    service = None
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = json.loads(line)
+            cmd = command.get('cmd')
+        except (ValueError, AttributeError):
+            self._send({'error': '无效的命令'})
+            return
+
+        try:
+            if cmd == 'subscribe':
+                self._stream_events(command.get('subscriber'))
+            elif cmd == 'snapshot':
+                self._send({'games': self.service.hub.snapshot()})
+            elif cmd == 'status':
+                self._send(self.service.status())
+            elif cmd == 'refresh':
+                self.service.request_refresh()
+                self._send({'ok': True})
+            else:
+                self._send({'error': f"未知命令: {cmd}"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def _stream_events(self, subscriber_id=None):
+        hub = self.service.hub
+        subscriber = hub.subscribe(subscriber_id)
+        try:
+            while not subscriber.dropped:
+                try:
+                    seq, event, data = subscriber.queue.get(timeout=self.service.heartbeat)
+                except queue.Empty:
+                    # 心跳，让客户端及时发现断线
+                    self._send({'event': 'ping'})
+                    continue
+                self._send({'seq': seq, 'event': event, 'data': data})
+        finally:
+            hub.unsubscribe(subscriber)
+
+
+class MonitorService:
+    """在本地套接字上提供比赛状态；reminder 为运行检测循环的提醒对象（其 hub 即事件来源）"""
+
+    def __init__(self, address=DEFAULT_SOCKET, reminder=None, hub=None, heartbeat=15.0):
+        self.address = address
+        self.reminder = reminder
+        self.hub = hub or (reminder.hub if reminder is not None and reminder.hub is not None else GameHub())
+        if reminder is not None:
+            reminder.hub = self.hub
+        self.heartbeat = heartbeat
+        self.started = time.time()
+        self._server = None
+
+    def start(self):
+        """在后台线程开始接受连接"""
+        family, addr = parse_address(self.address)
+        handler = type('ServiceHandler', (_ServiceHandler,), {'service': self})
+        if family == socket.AF_INET:
+            server = socketserver.ThreadingTCPServer(addr, handler, bind_and_activate=False)
+            server.allow_reuse_address = True
+        else:
+            self._remove_stale_socket(addr)
+            server = socketserver.ThreadingUnixStreamServer(addr, handler, bind_and_activate=False)
+        server.daemon_threads = True
+        try:
+            server.server_bind()
+            server.server_activate()
+        except OSError:
+            server.server_close()
+            raise
+        self._server = server
+        threading.Thread(target=server.serve_forever, name='nba-monitor-ipc', daemon=True).start()
+        logger.info(f"监控服务已启动: {self.address}")
+
+    def _remove_stale_socket(self, path):
+        # 上次异常退出留下的套接字文件；已有服务在运行时不覆盖
+        if not os.path.exists(path):
+            return
+        try:
+            send_command(path, 'status', timeout=1.0)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError(f"监控服务已在运行: {path}")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        family, addr = parse_address(self.address)
+        if family != socket.AF_INET:
+            try:
+                os.unlink(addr)
+            except OSError:
+                pass
+        logger.info("监控服务已停止")
+
+    def status(self):
+        reminder = self.reminder
+        status = {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started, 1),
+            'games': len(self.hub.games),
+            'subscribers': len(self.hub),
+        }
+        if reminder is not None:
+            last_poll = reminder.scheduler.last_poll
+            status['last_poll_age'] = None if last_poll is None else round(time.monotonic() - last_poll, 1)
+            status['pending_alerts'] = reminder.dispatcher.pending()
+        return status
+
+    def request_refresh(self):
+        """让检测循环立即检查一次（最小请求间隔仍然生效）"""
+        if self.reminder is not None:
+            self.reminder.wakeup.set()
+
+
+class ServiceClient(FanoutClient):
+    """界面端连接监控服务，接口与 FanoutClient 相同（断线后自动重连）"""
+
+    def __init__(self, address=DEFAULT_SOCKET, on_games=None, on_alert=None, reconnect_delay=5.0,
+                 timeout=60.0, subscriber=None):
+        super().__init__('', on_games=on_games, on_alert=on_alert,
+                         reconnect_delay=reconnect_delay, timeout=timeout, subscriber=subscriber)
+        self.url = address
+
+    def _connect(self):
+        sock = connect(self.url, self.timeout)
+        command = {'cmd': 'subscribe'}
+        if self.subscriber is not None:
+            command['subscriber'] = self.subscriber
+        sock.sendall(json.dumps(command).encode('utf-8') + b'\n')
+        return sock
+
+    def _events(self, connection):
+        with connection.makefile('rb') as stream:
+            for line in stream:
+                message = json.loads(line)
+                if message.get('event') != 'ping':
+                    yield message['event'], message['data']
+
+    def stop(self):
+        # 读取文件还引用着套接字，close() 不会打断阻塞的读取，先 shutdown
+        connection = self._response
+        if connection is not None:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        super().stop()
+
+    def request_refresh(self):
+        """请求服务立即检查一次，成功返回True"""
+        try:
+            return send_command(self.url, 'refresh').get('ok', False)
+        except (OSError, ValueError) as e:
+            logger.error(f"请求监控服务刷新失败: {e}")
+            return False
+
+
+def run_service(address=DEFAULT_SOCKET, metrics_port=None, rules_path=None, reminder=None):
+    """启动监控服务并在当前线程运行检测循环，直到 Ctrl+C 或 SIGTERM
+
+    reminder 为运行检测循环的提醒对象（默认 NBAGameReminder，Android服务中换成发送系统通知的子类）
+    """
+    import signal
+
+    import metrics
+
+    def on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    # 被服务管理器停止时同样走正常退出流程（保存状态）
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    if reminder is None:
+        from nba_game_reminder import NBAGameReminder
+        reminder = NBAGameReminder()
+    if rules_path:
+        from rule_engine import load_rules
+        reminder.ALERT_RULES = load_rules(rules_path)
+    service = MonitorService(address, reminder)
+    service.start()
+    if metrics_port is not None:
+        metrics.start_metrics_server(metrics_port)
+    try:
+        reminder.run()
+    finally:
+        service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NBA提醒无界面监控服务")
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'status', 'snapshot', 'refresh'],
+                        help="run 启动服务（默认），其余命令查询正在运行的服务")
+    parser.add_argument('--socket', default=os.environ.get('NBA_REMINDER_SERVICE', DEFAULT_SOCKET),
+                        help=f"Unix套接字路径或 tcp:127.0.0.1:PORT（默认 {DEFAULT_SOCKET}）")
+    parser.add_argument('--rules', metavar='PATH', help="从JSON文件加载提醒规则，代替默认的提醒条件")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="在 127.0.0.1:PORT/metrics 暴露运行指标（Prometheus文本格式）")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run_service(args.socket, args.metrics_port, args.rules)
+        return 0
+    try:
+        reply = send_command(args.socket, args.command)
+    except (OSError, ValueError) as e:
+        print(f"无法连接监控服务 {args.socket}: {e}")
+        return 1
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
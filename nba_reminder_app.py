@@ -5,50 +5,43 @@ NBA压哨绝杀球提醒系统 - 移动应用版
 基于KivyMD开发的Android/iOS应用
 """
 
-import requests
-from bs4 import BeautifulSoup
+import bisect
 import logging
 import time
-import re
-from datetime import datetime
-import json
 import os
-from threading import Thread
+from collections import deque
 
-# KivyMD imports
-from kivy.app import App
+from log_setup import setup_logging
+from fanout_server import FanoutClient
+from monitor_service import ServiceClient
+from game_record import Game
+from poll_scheduler import game_key
+from refresh_worker import RefreshWorker
+from reminder_core import ReminderCore
+
+# Kivy imports
 from kivy.clock import Clock
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.uix.button import Button
 from kivy.uix.switch import Switch
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.gridlayout import GridLayout
 from kivy.metrics import dp
 from kivy.utils import platform
 from kivy.core.text import LabelBase
-import sys
 
 # KivyMD imports
 from kivymd.app import MDApp
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
-from kivymd.uix.button import MDRaisedButton, MDFlatButton
+from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.scrollview import MDScrollView
 from kivymd.uix.card import MDCard
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.screenmanager import MDScreenManager
 from kivymd.uix.toolbar import MDTopAppBar
 from kivymd.uix.list import MDList, OneLineListItem
-from kivymd.uix.dialog import MDDialog
-from kivymd.uix.textfield import MDTextField
-from kivymd.theming import ThemeManager
 
 # 移动平台通知
 try:
     if platform == 'android':
         from jnius import autoclass
-        from android.runnable import run_on_ui_thread
         from android import api_version
         PythonActivity = autoclass('org.kivy.android.PythonActivity')
         Notification = autoclass('android.app.Notification')
@@ -63,211 +56,27 @@ try:
 except:
     ANDROID_AVAILABLE = False
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('nba_reminder.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# buildozer.spec 中 services = Monitor:... 生成的服务类（包名.Service + 服务名）
+ANDROID_SERVICE_CLASS = 'org.nba.nbareminder.ServiceMonitor'
+
+# 配置日志（后台线程写入，文件按大小轮转）
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
 
-class NBAGameReminderCore:
-    """NBA比赛提醒核心逻辑类（复用原有代码）"""
-    
-    def __init__(self):
-        self.url = "https://nba.hupu.com/games"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.notified_games = set()
-        self.state_file = 'nba_reminder_state.json'
-        self.load_state()
-        self.TIME_THRESHOLD = 120  # 2分钟
-        self.SCORE_DIFF_THRESHOLD = 5  # 5分
-        
-    def load_state(self):
-        """加载之前提醒过的比赛状态"""
-        if os.path.exists(self.state_file):
-            try:
-                with open(self.state_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.notified_games = set(data.get('notified_games', []))
-                    logger.info(f"已加载 {len(self.notified_games)} 场已提醒的比赛记录")
-            except Exception as e:
-                logger.error(f"加载状态文件失败: {e}")
-    
-    def save_state(self):
-        """保存提醒状态"""
-        try:
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'notified_games': list(self.notified_games),
-                    'last_update': datetime.now().isoformat()
-                }, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存状态文件失败: {e}")
-    
-    def fetch_games(self):
-        """从虎扑获取NBA比赛数据"""
-        try:
-            response = requests.get(self.url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logger.error(f"获取比赛数据失败: {e}")
-            return None
-    
-    def parse_period(self, period_str):
-        """解析比赛节次"""
-        if not period_str:
-            return None
-        period_str = period_str.strip().upper()
-        if 'Q4' in period_str or '第四节' in period_str:
-            return 'Q4'
-        elif 'OT' in period_str or '加时' in period_str:
-            return 'OT'
-        return None
-    
-    def parse_game_info(self, html):
-        """解析HTML，提取比赛信息"""
-        games = []
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            game_boxes = soup.find_all('div', class_='list_box')
-            logger.info(f"找到 {len(game_boxes)} 个比赛盒子")
-            
-            for box in game_boxes:
-                try:
-                    game_info = self.extract_game_data_from_box(box)
-                    if game_info and game_info.get('score1') is not None:
-                        games.append(game_info)
-                except Exception as e:
-                    logger.debug(f"解析单个比赛盒子失败: {e}")
-                    continue
-        except Exception as e:
-            logger.error(f"解析HTML失败: {e}")
-        return games
-    
-    def extract_game_data_from_box(self, box):
-        """从比赛盒子中提取比赛数据"""
-        game_info = {
-            'team1': None,
-            'team2': None,
-            'score1': None,
-            'score2': None,
-            'period': None,
-            'time_remaining': None,
-            'status': None
-        }
-        
-        try:
-            team_vs_a = box.find('div', class_='team_vs_a')
-            if not team_vs_a:
-                return None
-            
-            # 提取第一支球队
-            team_a_1 = team_vs_a.find('div', class_='team_vs_a_1')
-            if team_a_1:
-                txt_div = team_a_1.find('div', class_='txt')
-                if txt_div:
-                    team1_link = txt_div.find('a')
-                    if team1_link:
-                        game_info['team1'] = team1_link.get_text(strip=True)
-                    score_elem = txt_div.find('span', class_='num')
-                    if score_elem:
-                        try:
-                            game_info['score1'] = int(score_elem.get_text(strip=True))
-                        except ValueError:
-                            pass
-            
-            # 提取第二支球队
-            team_a_2 = team_vs_a.find('div', class_='team_vs_a_2')
-            if team_a_2:
-                txt_div = team_a_2.find('div', class_='txt')
-                if txt_div:
-                    team2_link = txt_div.find('a')
-                    if team2_link:
-                        game_info['team2'] = team2_link.get_text(strip=True)
-                    score_elem = txt_div.find('span', class_='num')
-                    if score_elem:
-                        try:
-                            game_info['score2'] = int(score_elem.get_text(strip=True))
-                        except ValueError:
-                            pass
-            
-            # 提取比赛状态和时间信息
-            team_vs_c = box.find('div', class_='team_vs_c')
-            if team_vs_c:
-                status_elem = team_vs_c.find('span', class_='b')
-                if status_elem:
-                    status_text = status_elem.get_text(strip=True)
-                    game_info['status'] = status_text
-                    
-                    period_time_p = status_elem.find('p')
-                    if period_time_p:
-                        period_time_text = period_time_p.get_text(strip=True)
-                        
-                        period_pattern = r'(第[一二三四]节|加时(?:赛)?)'
-                        period_match = re.search(period_pattern, period_time_text)
-                        if period_match:
-                            period_str = period_match.group(0)
-                            if '第四节' in period_str:
-                                game_info['period'] = 'Q4'
-                            elif '加时' in period_str:
-                                game_info['period'] = 'OT'
-                        
-                        time_pattern = r'剩\s*(\d{1,2}):(\d{2})'
-                        time_match = re.search(time_pattern, period_time_text)
-                        if time_match:
-                            minutes = int(time_match.group(1))
-                            seconds = int(time_match.group(2))
-                            if 0 <= minutes <= 12 and 0 <= seconds < 60:
-                                game_info['time_remaining'] = minutes * 60 + seconds
-                        elif '结束' in period_time_text:
-                            game_info['time_remaining'] = 0
-            
-            if game_info.get('score1') is not None and game_info.get('score2') is not None:
-                return game_info
-        except Exception as e:
-            logger.debug(f"提取比赛数据出错: {e}")
-        return None
+class NBAGameReminderCore(ReminderCore):
+    """NBA比赛提醒核心逻辑类（与命令行版共用 reminder_core，通知走移动平台）"""
     
-    def check_game_condition(self, game):
-        """检查比赛是否满足提醒条件"""
-        period = self.parse_period(game.get('period', ''))
-        if period not in ['Q4', 'OT']:
-            return False
-        
-        time_remaining = game.get('time_remaining')
-        if time_remaining is None or time_remaining > self.TIME_THRESHOLD:
-            return False
-        
-        score1 = game.get('score1')
-        score2 = game.get('score2')
-        if score1 is None or score2 is None:
-            return False
-        
-        score_diff = abs(score1 - score2)
-        if score_diff >= self.SCORE_DIFF_THRESHOLD:
-            return False
-        
+    def _notify(self, game):
+        """发送移动平台通知（在通知队列的工作线程中调用）"""
+        time_str = f"{game.clock // 60}:{game.clock % 60:02d}" if game.clock is not None else "未知"
+        title = "⚡ NBA压哨绝杀提醒 ⚡"
+        message = (f"{game.team1 or '未知'} {game.score1} - {game.score2} {game.team2 or '未知'}\n"
+                   f"{game.period or '未知'} | 剩余: {time_str} | 分差: {game.score_diff}分"
+                   f" | 紧张度: {self.clutch.score(game):.0%}")
+        NotificationHelper.send_notification(title, message, game)
         return True
-    
-    def get_game_id(self, game):
-        """生成比赛唯一标识"""
-        team1 = game.get('team1', 'Team1')
-        team2 = game.get('team2', 'Team2')
-        score1 = game.get('score1', 0)
-        score2 = game.get('score2', 0)
-        period = game.get('period', '')
-        time_remaining = game.get('time_remaining', 0)
-        return f"{team1}_{team2}_{score1}_{score2}_{period}_{time_remaining}"
 
 
 class NotificationHelper:
@@ -328,9 +137,38 @@ class NotificationHelper:
             logger.error(f"发送Android通知失败: {e}")
 
 
+CRITICAL_COLOR = (1, 0.8, 0.8, 1)
+NORMAL_COLOR = (1, 1, 1, 1)
+
+
 class GameListCard(MDCard):
-    """比赛信息卡片"""
-    pass
+    """比赛信息卡片：每场比赛只创建一次，之后只更新变化的文字和背景色"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(
+            orientation='vertical',
+            padding=dp(15),
+            spacing=dp(5),
+            size_hint_y=None,
+            height=dp(100),
+            md_bg_color=NORMAL_COLOR,
+            **kwargs
+        )
+        self.game_label = MDLabel(text="", theme_text_color="Primary", bold=True)
+        self.info_label = MDLabel(text="", theme_text_color="Secondary", font_style="Caption")
+        self.add_widget(self.game_label)
+        self.add_widget(self.info_label)
+        self.is_critical = False
+    
+    def update(self, game_text, info_text, is_critical):
+        """只修改有变化的属性，避免不必要的重新布局和重绘"""
+        if self.game_label.text != game_text:
+            self.game_label.text = game_text
+        if self.info_label.text != info_text:
+            self.info_label.text = info_text
+        if self.is_critical != is_critical:
+            self.is_critical = is_critical
+            self.md_bg_color = CRITICAL_COLOR if is_critical else NORMAL_COLOR
 
 
 class MainScreen(MDScreen):
@@ -340,7 +178,12 @@ class MainScreen(MDScreen):
         super().__init__(**kwargs)
         self.app = None
         self.is_monitoring = False
-        self.monitor_thread = None
+        self.refresh_worker = None  # 唯一的抓取/解析线程（refresh_worker.RefreshWorker）
+        self.current_games = []  # 最近一次获取到的比赛，用于决定轮询间隔
+        self.client = None  # 订阅分发服务/监控服务时的客户端（FanoutClient / ServiceClient）
+        self.game_cards = {}  # 比赛标识 -> GameListCard，按页面顺序
+        self.empty_item = OneLineListItem(text="暂无比赛数据")
+        self.render_times = deque(maxlen=120)  # 最近的 show_games 耗时（秒）
         
         # 主布局
         main_layout = MDBoxLayout(orientation='vertical', spacing=dp(10), padding=dp(10))
@@ -368,7 +211,6 @@ class MainScreen(MDScreen):
             size_hint_x=0.7
         )
         # 使用Kivy原生的Switch（KivyMD 1.2.0没有MDSwitch）
-        from kivy.uix.switch import Switch
         self.monitor_switch = Switch()
         self.monitor_switch.bind(active=self.on_switch_active)
         switch_layout.add_widget(switch_label)
@@ -402,6 +244,9 @@ class MainScreen(MDScreen):
     def set_app(self, app):
         """设置应用引用"""
         self.app = app
+        self.refresh_worker = RefreshWorker(
+            app.reminder_core, self._on_games, self._on_status,
+            post=lambda func: Clock.schedule_once(lambda dt: func()))
     
     def on_switch_active(self, instance, value):
         """监控开关切换"""
@@ -417,114 +262,212 @@ class MainScreen(MDScreen):
         
         self.is_monitoring = True
         self.status_label.text = "状态: 监控中..."
-        self.monitor_thread = Thread(target=self._monitor_loop, daemon=True)
-        self.monitor_thread.start()
+        if self.app and self.app.service_address:
+            # 连接本机的无界面监控服务：检测和提醒都由服务进程完成，界面只负责渲染
+            if self.app.android_service:
+                self.app.start_android_service()
+            self.client = ServiceClient(self.app.service_address, on_games=self._on_server_games)
+            self.client.start()
+            logger.info(f"监控已启动（连接监控服务 {self.app.service_address}）")
+            return
+        if self.app and self.app.server_url:
+            # 客户端模式：订阅分发服务，不自己抓取页面
+            self.client = FanoutClient(self.app.server_url,
+                                       on_games=self._on_server_games, on_alert=self._on_server_alert,
+                                       subscriber=self.app.subscriber_id)
+            self.client.start()
+            logger.info(f"监控已启动（订阅 {self.app.server_url}）")
+            return
+        self.refresh_worker.set_auto(True)
         logger.info("监控已启动")
     
     def stop_monitoring(self):
         """停止监控"""
         self.is_monitoring = False
+        if self.client is not None:
+            self.client.stop()
+            self.client = None
+        if self.app and self.app.android_service:
+            self.app.stop_android_service()
+        if self.refresh_worker is not None:
+            # 立即生效，进行中的请求结果会被丢弃
+            self.refresh_worker.set_auto(False)
         self.status_label.text = "状态: 已停止"
         logger.info("监控已停止")
     
-    def _monitor_loop(self):
-        """监控循环（在后台线程运行）"""
-        while self.is_monitoring:
-            try:
-                Clock.schedule_once(lambda dt: self.refresh_games(None))
-                time.sleep(60)  # 每60秒检查一次
-            except Exception as e:
-                logger.error(f"监控循环出错: {e}")
-                time.sleep(60)
+    def _on_games(self, games):
+        """刷新线程获取到新的比赛列表（已在界面线程）"""
+        self.current_games = games
+        self.show_games(games)
     
-    def refresh_games(self, instance):
-        """刷新比赛列表"""
-        def update_ui(games):
-            """更新UI（必须在主线程）"""
-            self.games_list.clear_widgets()
-            
-            if not games:
-                item = OneLineListItem(text="暂无比赛数据")
-                self.games_list.add_widget(item)
-                return
-            
-            for game in games:
-                team1 = game.get('team1', '球队1') or '未知'
-                team2 = game.get('team2', '球队2') or '未知'
-                score1 = game.get('score1', 0)
-                score2 = game.get('score2', 0)
-                period = game.get('period', '未知')
-                time_remaining = game.get('time_remaining')
-                
-                if time_remaining is not None:
-                    minutes = time_remaining // 60
-                    seconds = time_remaining % 60
-                    time_str = f"{minutes}:{seconds:02d}"
-                else:
-                    time_str = "未知"
-                
-                score_diff = abs(score1 - score2)
-                
-                # 检查是否满足提醒条件
-                is_critical = False
-                if self.app:
-                    is_critical = self.app.reminder_core.check_game_condition(game)
-                
-                # 创建卡片
-                card = MDCard(
-                    orientation='vertical',
-                    padding=dp(15),
-                    spacing=dp(5),
-                    size_hint_y=None,
-                    height=dp(100),
-                    md_bg_color=(1, 0.8, 0.8, 1) if is_critical else (1, 1, 1, 1)
-                )
-                
-                # 比赛信息
-                game_text = f"{team1} {score1} - {score2} {team2}"
-                game_label = MDLabel(
-                    text=game_text,
-                    theme_text_color="Primary",
-                    bold=True
-                )
-                card.add_widget(game_label)
-                
-                info_text = f"{period} | 剩余: {time_str} | 分差: {score_diff}分"
-                if is_critical:
-                    info_text += " ⚠️ 关键时刻！"
-                info_label = MDLabel(
-                    text=info_text,
-                    theme_text_color="Secondary",
-                    font_style="Caption"
-                )
-                card.add_widget(info_label)
-                
-                self.games_list.add_widget(card)
-                
-                # 发送通知
-                if is_critical and self.app:
-                    game_id = self.app.reminder_core.get_game_id(game)
-                    if game_id not in self.app.reminder_core.notified_games:
-                        title = "⚡ NBA压哨绝杀提醒 ⚡"
-                        message = f"{team1} {score1} - {score2} {team2}\n{period} | 剩余: {time_str} | 分差: {score_diff}分"
-                        NotificationHelper.send_notification(title, message, game)
-                        self.app.reminder_core.notified_games.add(game_id)
-                        self.app.reminder_core.save_state()
+    def _on_status(self, text):
+        self.status_label.text = text
+    
+    def _on_server_games(self, games):
+        """分发服务推送了新的比赛列表（后台线程，games 为该时刻的副本）"""
+        Clock.schedule_once(lambda dt: self._show_server_games(games))
+        Clock.schedule_once(lambda dt: self.status_label.setter('text')(
+            self.status_label, f"状态: 已更新 ({len(games)}场比赛，来自服务端)"))
+    
+    def _show_server_games(self, games):
+        # 客户端模式下本地只计算紧张度，用于排序
+        self.current_games = games
+        self.app.reminder_core.clutch.update(games)
+        self.show_games(games)
+    
+    def _on_server_alert(self, game):
+        """分发服务推送了提醒（后台线程）"""
+        core = self.app.reminder_core
+        if not core.is_notified(game):
+            core.submit_alert(game)
+    
+    def show_games(self, games, notify=True):
+        """更新比赛列表（必须在主线程）
+        
+        按比赛标识复用卡片：新出现的比赛创建卡片，消失的比赛移除卡片，其余只更新变化的文字和颜色；
+        比赛按紧张度从高到低排列（按5%分档，避免小幅波动造成频繁重排）
+        """
+        start = time.perf_counter()
+        games = [Game.coerce(game) for game in games]
+        clutch = {}
+        if self.app:
+            tracker = self.app.reminder_core.clutch
+            clutch = {game_key(game): tracker.score(game) for game in games}
+            games.sort(key=lambda game: -round(clutch[game_key(game)] * 20))
         
-        # 在后台线程获取数据
-        def fetch_and_update():
-            if not self.app:
-                return
+        if not games:
+            if self.game_cards or self.empty_item.parent is None:
+                self.games_list.clear_widgets()
+                self.game_cards = {}
+                self.games_list.add_widget(self.empty_item)
+            return
+        if self.empty_item.parent is not None:
+            self.games_list.remove_widget(self.empty_item)
+        
+        cards = {}
+        for game in games:
+            key = game_key(game)
+            card = self.game_cards.get(key)
+            if card is None:
+                card = GameListCard()
+            cards[key] = card
+            
+            team1 = game.team1 or '未知'
+            team2 = game.team2 or '未知'
+            period = game.period or '未知'
             
-            html = self.app.reminder_core.fetch_games()
-            if html:
-                games = self.app.reminder_core.parse_game_info(html)
-                Clock.schedule_once(lambda dt: update_ui(games))
-                self.status_label.text = f"状态: 已更新 ({len(games)}场比赛)"
+            if game.clock is not None:
+                minutes = game.clock // 60
+                seconds = game.clock % 60
+                time_str = f"{minutes}:{seconds:02d}"
             else:
-                Clock.schedule_once(lambda dt: self.status_label.setter('text')('状态: 获取失败'))
+                time_str = "未知"
+            
+            # 检查是否满足提醒条件
+            is_critical = False
+            if self.app:
+                is_critical = self.app.reminder_core.check_game_condition(game)
+            
+            info_text = f"{period} | 剩余: {time_str} | 分差: {game.score_diff}分"
+            if clutch.get(key):
+                info_text += f" | 紧张度: {clutch[key]:.0%}"
+            if is_critical:
+                info_text += " ⚠️ 关键时刻！"
+            card.update(f"{team1} {game.score1} - {game.score2} {team2}", info_text, is_critical)
+            
+            # 发送通知（放入通知队列，不阻塞界面；客户端模式下由服务端推送提醒）
+            if notify and is_critical and self.app and self.client is None:
+                core = self.app.reminder_core
+                if not core.is_notified(game):
+                    core.submit_alert(game)
+        
+        # 比赛顺序变化时只移动位置变了的卡片（卡片本身复用，不清空列表）
+        if list(cards) != list(self.game_cards):
+            for key, card in self.game_cards.items():
+                if key not in cards:
+                    self.games_list.remove_widget(card)
+            stable = stable_keys(list(self.game_cards), list(cards))
+            for key, card in cards.items():
+                if key not in stable and card.parent is not None:
+                    self.games_list.remove_widget(card)
+            # 此时列表中只剩不用移动的卡片，按新顺序依次插入其余卡片；
+            # children 与显示顺序相反，显示在第 position 位对应 index = 子控件数 - position
+            for position, (key, card) in enumerate(cards.items()):
+                if key not in stable:
+                    self.games_list.add_widget(card, index=len(self.games_list.children) - position)
+        self.game_cards = cards
+        self.render_times.append(time.perf_counter() - start)
+    
+    def refresh_games(self, instance):
+        """刷新比赛列表"""
+        if self.client is not None:
+            # 客户端模式下比赛数据由服务端推送
+            if isinstance(self.client, ServiceClient):
+                self.client.request_refresh()
+            self.show_games(self.client.snapshot())
+            return
         
-        Thread(target=fetch_and_update, daemon=True).start()
+        # 由刷新线程获取数据；已有请求在进行时不会重复抓取
+        if self.refresh_worker is not None:
+            self.refresh_worker.request()
+
+
+def stable_keys(old, new):
+    """old 中已经按 new 的顺序排列的最长子序列：这些卡片位置不用变，只移动其余卡片"""
+    position = {key: i for i, key in enumerate(new)}
+    tails = []  # 长度为 i+1 的递增子序列的最小结尾位置
+    tail_keys = []
+    previous = {}
+    for key in old:
+        if key not in position:
+            continue
+        i = bisect.bisect_left(tails, position[key])
+        previous[key] = tail_keys[i - 1] if i else None
+        if i == len(tails):
+            tails.append(position[key])
+            tail_keys.append(key)
+        else:
+            tails[i] = position[key]
+            tail_keys[i] = key
+    stable = set()
+    key = tail_keys[-1] if tail_keys else None
+    while key is not None:
+        stable.add(key)
+        key = previous[key]
+    return stable
+
+
+def run_ui_benchmark(screen, n_games=20, frames=120):
+    """界面基准：每帧用一组新的合成比赛数据刷新列表，记录帧间隔和 show_games 耗时
+
+    设置环境变量 NBA_UI_BENCH=<比赛数> 启动应用即可运行，结果写入日志
+    """
+    from synthetic_pages import generate_page
+    
+    # 球队顺序固定、比分和时间每帧变化，模拟比赛进行中的刷新
+    snapshots = []
+    for seed in range(10):
+        _, expected = generate_page(n_games, states={'live': 3, 'clutch': 1, 'final': 1}, seed=seed)
+        snapshots.append([Game.from_dict(g) for g in expected])
+    frame_times = []
+    
+    def step(dt):
+        if len(frame_times) >= frames:
+            def pct(values, p):
+                values = sorted(values)
+                return values[min(int(p / 100 * len(values)), len(values) - 1)] * 1000
+            renders = list(screen.render_times)
+            logger.info(f"界面基准: {n_games} 场比赛 {frames} 帧 | "
+                        f"帧间隔 p50={pct(frame_times, 50):.1f}ms p95={pct(frame_times, 95):.1f}ms | "
+                        f"show_games p50={pct(renders, 50):.2f}ms p95={pct(renders, 95):.2f}ms")
+            return False
+        frame_times.append(dt)
+        screen.show_games(snapshots[len(frame_times) % len(snapshots)], notify=False)
+    
+    # 第一次刷新包含创建卡片的开销，不计入
+    screen.show_games(snapshots[0], notify=False)
+    screen.render_times.clear()
+    Clock.schedule_interval(step, 0)
 
 
 class NBAReminderApp(MDApp):
@@ -533,6 +476,17 @@ class NBAReminderApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.reminder_core = NBAGameReminderCore()
+        # 设置后订阅该分发服务（fanout_server），不再自己抓取页面
+        self.server_url = os.environ.get('NBA_REMINDER_SERVER')
+        # 服务端多用户订阅中本机用户的标识（只接收发给该用户的提醒）
+        self.subscriber_id = os.environ.get('NBA_REMINDER_SUBSCRIBER')
+        # 设置后连接该本地监控服务（monitor_service），优先于 NBA_REMINDER_SERVER
+        self.service_address = os.environ.get('NBA_REMINDER_SERVICE')
+        # Android 上检测在后台前台服务（android_service.py）中运行，界面退到后台或关闭后仍会提醒
+        self.android_service = (platform == 'android' and ANDROID_AVAILABLE
+                                and not self.service_address and not self.server_url)
+        if self.android_service:
+            self.service_address = os.path.join(self.user_data_dir, 'nba_reminder.sock')
         self.theme_cls.theme_style = "Light"
         self.theme_cls.primary_palette = "Blue"
         
@@ -580,21 +534,42 @@ class NBAReminderApp(MDApp):
             except Exception as e:
                 logger.warning(f"设置中文字体失败: {e}，将使用默认字体")
     
+    def start_android_service(self):
+        """启动Android后台监控服务（已在运行时不重复启动），套接字路径作为服务参数"""
+        try:
+            autoclass(ANDROID_SERVICE_CLASS).start(PythonActivity.mActivity, self.service_address)
+            logger.info("Android后台监控服务已启动")
+        except Exception as e:
+            logger.error(f"启动Android后台监控服务失败: {e}")
+
+    def stop_android_service(self):
+        """停止Android后台监控服务（关闭监控开关时）"""
+        try:
+            autoclass(ANDROID_SERVICE_CLASS).stop(PythonActivity.mActivity)
+            logger.info("Android后台监控服务已停止")
+        except Exception as e:
+            logger.error(f"停止Android后台监控服务失败: {e}")
+
     def build(self):
         """构建应用界面"""
         screen_manager = MDScreenManager()
-        main_screen = MainScreen(name='main')
-        main_screen.set_app(self)
-        screen_manager.add_widget(main_screen)
+        self.main_screen = MainScreen(name='main')
+        self.main_screen.set_app(self)
+        screen_manager.add_widget(self.main_screen)
         return screen_manager
     
     def on_start(self):
         """应用启动时"""
         logger.info("NBA提醒应用已启动")
+        ui_bench = os.environ.get('NBA_UI_BENCH')
+        if ui_bench:
+            run_ui_benchmark(self.main_screen, int(ui_bench))
     
     def on_stop(self):
         """应用停止时"""
-        self.reminder_core.save_state()
+        if self.main_screen.refresh_worker is not None:
+            self.main_screen.refresh_worker.stop()
+        self.reminder_core.close()
         logger.info("NBA提醒应用已停止")
 
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+通知发送队列
+检测线程只把提醒放入有界队列，由后台工作线程调用通知后端发送，慢速的通知后端不再阻塞轮询；
+同一场比赛排队中的提醒合并为最新状态（正在发送时的新状态在发送完成后补发），刚发送过的比赛在合并窗口内不再重复提醒；
+排队的提醒按优先级（比赛紧张度）发送，优先级相同时先进先出
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# submit() 的结果
+QUEUED = 'queued'  # 新加入队列
+MERGED = 'merged'  # 该比赛已有提醒在排队，并入该提醒
+COALESCED = 'coalesced'  # 合并窗口内刚发送过，不再提醒
+DROPPED = 'dropped'  # 队列已满且优先级低于所有排队的提醒，不加入队列
+
+
+class NotificationDispatcher:
+    """有界的通知发送队列（按比赛合并，队列满时丢弃优先级最低且最早的提醒）
+
+    on_drop(key, game) 在提醒因队列满被丢弃时调用（排队中的或新提交的，在提交线程中），调用方可据此撤销已提醒记录
+    clock() 返回当前时间（秒），用于合并窗口和排队时间；回放时传入快照时间
+    """
+
+    def __init__(self, send, workers=2, maxsize=64, coalesce_window=30.0, on_drop=None, clock=time.monotonic):
+        self.send = send  # send(game) -> bool，在工作线程中调用
+        self.on_drop = on_drop
+        self.clock = clock
+        self.workers = workers
+        self.maxsize = maxsize
+        self.coalesce_window = coalesce_window  # 同一场比赛两次提醒的最短间隔（秒）
+
+        self._pending = OrderedDict()  # key -> (game, 入队时间, 优先级)
+        self._in_flight = set()  # 正在发送的比赛
+        self._last_sent = {}  # key -> 最近一次发送完成的时间
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def _start(self):
+        # 第一次提交时才启动工作线程
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"nba-notify-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, game, priority=0.0):
+        """提交一条提醒，立即返回 QUEUED / MERGED / COALESCED / DROPPED
+
+        该比赛正在发送时，新状态排在队列中，等这次发送完成后再发送
+        """
+        now = self.clock()
+        dropped = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("通知队列已关闭")
+            if key in self._pending:
+                # 保留原来的排队位置和入队时间，只更新为最新的比赛状态和优先级
+                self._pending[key] = (game, self._pending[key][1], priority)
+                metrics.NOTIFY_QUEUE_EVENTS.labels(MERGED).inc()
+                return MERGED
+            last_sent = self._last_sent.get(key)
+            if key not in self._in_flight and last_sent is not None and now - last_sent < self.coalesce_window:
+                metrics.NOTIFY_QUEUE_EVENTS.labels(COALESCED).inc()
+                return COALESCED
+
+            result = QUEUED
+            if len(self._pending) >= self.maxsize:
+                lowest = min(self._pending, key=lambda k: self._pending[k][2])
+                if priority < self._pending[lowest][2]:
+                    # 新提醒的优先级最低：丢弃新提醒，排队的提醒不变
+                    dropped, result = (key, game), DROPPED
+                else:
+                    dropped = (lowest, self._pending.pop(lowest)[0])
+                metrics.NOTIFY_QUEUE_EVENTS.labels(DROPPED).inc()
+                logger.warning(f"通知队列已满，丢弃优先级最低的提醒: {dropped[0]}")
+            if result == QUEUED:
+                self._pending[key] = (game, now, priority)
+                metrics.NOTIFY_QUEUE_EVENTS.labels(QUEUED).inc()
+                metrics.NOTIFY_QUEUE_DEPTH.set(len(self._pending))
+                if not self._threads:
+                    self._start()
+                self._cond.notify()
+        if dropped is not None and self.on_drop is not None:
+            try:
+                self.on_drop(*dropped)
+            except Exception as e:
+                logger.error(f"处理丢弃的提醒出错: {e}")
+        return result
+
+    def _next_key(self):
+        # 调用方持有锁；同一场比赛不并发发送，正在发送的比赛的新状态等它发送完成
+        # 队列很短（maxsize），线性查找优先级最高的提醒即可
+        ready = [k for k in self._pending if k not in self._in_flight]
+        if not ready:
+            return None
+        return max(ready, key=lambda k: self._pending[k][2])
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                key = self._next_key()
+                while key is None and (self._pending or not self._closed):
+                    self._cond.wait()
+                    key = self._next_key()
+                if key is None:
+                    return
+                game, queued_at, _ = self._pending.pop(key)
+                self._in_flight.add(key)
+                metrics.NOTIFY_QUEUE_DEPTH.set(len(self._pending))
+            metrics.NOTIFY_QUEUE_WAIT.observe(self.clock() - queued_at)
+
+            try:
+                self.send(game)
+            except Exception as e:
+                logger.error(f"发送通知出错: {e}")
+            finally:
+                with self._cond:
+                    self._in_flight.discard(key)
+                    self._last_sent[key] = self.clock()
+                    self._prune()
+                    self._cond.notify_all()
+
+    def _prune(self):
+        # 清理早已超出合并窗口的发送记录
+        if len(self._last_sent) > 4 * self.maxsize:
+            cutoff = self.clock() - self.coalesce_window
+            self._last_sent = {k: t for k, t in self._last_sent.items() if t >= cutoff}
+
+    def pending(self):
+        """排队和发送中的提醒数"""
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def join(self, timeout=None):
+        """等待队列中的提醒全部发送完，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """停止接收新提醒，尽量发送完已排队的提醒"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        with self._cond:
+            if self._pending:
+                logger.warning(f"退出时仍有 {len(self._pending)} 条提醒未发送")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提醒记录存储
+按稳定的比赛标识（日期+球队）记录已提醒的比赛状态，超过有效期自动淘汰；
+通过只追加的日志文件持久化，每次写入O(1)，日志过长时自动压缩
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationStore:
+    """带有效期淘汰和追加日志的提醒记录"""
+
+    def __init__(self, path='nba_reminder_state.jsonl', ttl=2 * 24 * 3600, compact_min_lines=256):
+        self.path = path
+        self.ttl = ttl  # 记录有效期（秒）
+        self.compact_min_lines = compact_min_lines  # 日志行数超过此值且明显多于有效记录时压缩
+        self.entries = OrderedDict()  # 比赛标识 -> (最近提醒的状态, 提醒时间)，按提醒时间排序
+        self.journal_lines = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, game_key):
+        return game_key in self.entries
+
+    def is_notified(self, game_key, state):
+        """该比赛在该状态下是否已提醒过"""
+        entry = self.entries.get(game_key)
+        return entry is not None and entry[0] == state
+
+    def mark_notified(self, game_key, state, now=None):
+        """记录一次提醒并追加到日志"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.entries[game_key] = (state, now)
+            self.entries.move_to_end(game_key)
+            self._evict(now)
+            self._append({'k': game_key, 's': state, 't': now})
+            if self.journal_lines > max(self.compact_min_lines, 2 * len(self.entries)):
+                self._compact()
+
+    def forget(self, game_key):
+        """删除一场比赛的提醒记录（提醒没有发出时），下次满足条件会重新提醒"""
+        with self._lock:
+            if self.entries.pop(game_key, None) is not None:
+                self._append({'k': game_key, 'd': 1})
+
+    def _evict(self, now):
+        """淘汰过期记录（按提醒时间有序，只需检查最旧的几条）"""
+        deadline = now - self.ttl
+        while self.entries:
+            game_key, (_, notified_at) = next(iter(self.entries.items()))
+            if notified_at >= deadline:
+                break
+            del self.entries[game_key]
+
+    def _append(self, record):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.journal_lines += 1
+        except OSError as e:
+            logger.error(f"写入提醒日志失败: {e}")
+
+    def _compact(self):
+        """用当前有效记录重写日志"""
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for game_key, (state, notified_at) in self.entries.items():
+                    f.write(json.dumps({'k': game_key, 's': state, 't': notified_at},
+                                       ensure_ascii=False, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.path)
+            self.journal_lines = len(self.entries)
+            logger.debug(f"提醒日志已压缩，保留 {len(self.entries)} 条记录")
+        except OSError as e:
+            logger.error(f"压缩提醒日志失败: {e}")
+
+    def load(self, now=None):
+        """从日志恢复记录（日志长度受压缩限制，启动耗时与运行时长无关）"""
+        if not os.path.exists(self.path):
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self.entries.clear()
+            lines = 0
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                        game_key = record['k']
+                        if record.get('d'):
+                            self.entries.pop(game_key, None)
+                            continue
+                        self.entries[game_key] = (record['s'], record['t'])
+                        self.entries.move_to_end(game_key)
+                    except (ValueError, KeyError, TypeError):
+                        # 写入中断造成的残缺行
+                        logger.debug(f"跳过损坏的提醒日志行: {line!r}")
+            self.journal_lines = lines
+            self._evict(now)
+            if self.journal_lines > len(self.entries):
+                self._compact()
+
+    def compact(self, now=None):
+        """淘汰过期记录并压缩日志"""
+        with self._lock:
+            self._evict(time.time() if now is None else now)
+            self._compact()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+原始页面归档
+按内容寻址（SHA-256）压缩保存每次抓取到的页面，相同页面只存一份；
+另有按抓取时间排序的定长索引，支持二分查找的快速时间范围扫描，便于事后排查解析器失效问题
+
+目录结构:
+    <root>/objects/ab/cdef...   zlib压缩的页面内容，文件名为内容的SHA-256
+    <root>/index.bin            每条40字节：抓取时间(float64) + SHA-256摘要(32字节)
+
+用法:
+    python nba_game_reminder.py --archive pages/            # 运行时归档
+    python page_archive.py pages/ list --since 2025-11-23T08:00 --until 2025-11-23T12:00
+    python page_archive.py pages/ cat 2025-11-23T10:15:00 > page.html
+"""
+
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_RECORD = struct.Struct('<d32s')
+
+
+class PageArchive:
+    """内容寻址的压缩页面存储
+
+    read_only=True 时只读打开（查看命令使用）：不创建目录、不修改索引，可以和正在写入的进程同时使用；
+    索引末尾写到一半的记录读取时直接忽略
+    """
+
+    def __init__(self, root, compress_level=6, read_only=False):
+        self.root = root
+        self.compress_level = compress_level
+        self.read_only = read_only
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.bin')
+
+        self._lock = threading.Lock()
+        self._last_ts = 0.0
+        self._last_digest = None
+        self.stored = 0  # 本次运行新写入的页面数
+        self.deduplicated = 0  # 本次运行因内容相同而跳过写入的页面数
+        if read_only:
+            return
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        # 截掉写入中断的残缺记录，并恢复最后一条记录
+        if os.path.exists(self.index_path):
+            size = os.path.getsize(self.index_path)
+            if size % _RECORD.size:
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(size - size % _RECORD.size)
+            count = len(self)
+            if count:
+                self._last_ts, self._last_digest = self._record_at(count - 1)
+
+    def _object_path(self, hexdigest):
+        return os.path.join(self.objects_dir, hexdigest[:2], hexdigest[2:])
+
+    def __len__(self):
+        """索引中的抓取记录数"""
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // _RECORD.size
+
+    def _record_at(self, i):
+        with open(self.index_path, 'rb') as f:
+            f.seek(i * _RECORD.size)
+            ts, digest = _RECORD.unpack(f.read(_RECORD.size))
+        return ts, digest
+
+    def store(self, html, ts=None):
+        """归档一次抓取到的页面，返回内容摘要（十六进制）"""
+        if self.read_only:
+            raise PermissionError(f"页面归档以只读方式打开: {self.root}")
+        data = html.encode('utf-8') if isinstance(html, str) else html
+        digest = hashlib.sha256(data).digest()
+        hexdigest = digest.hex()
+
+        with self._lock:
+            # 索引必须按时间有序，时钟回拨时沿用上一条的时间
+            ts = max(time.time() if ts is None else ts, self._last_ts)
+
+            path = self._object_path(hexdigest)
+            if digest == self._last_digest or os.path.exists(path):
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(zlib.compress(data, self.compress_level))
+                os.replace(tmp_path, path)
+                self.stored += 1
+
+            with open(self.index_path, 'ab') as f:
+                f.write(_RECORD.pack(ts, digest))
+            self._last_ts, self._last_digest = ts, digest
+        return hexdigest
+
+    def get(self, hexdigest):
+        """按摘要读取页面内容"""
+        with open(self._object_path(hexdigest), 'rb') as f:
+            return zlib.decompress(f.read()).decode('utf-8')
+
+    @staticmethod
+    def _bisect(index, count, ts):
+        """第一条抓取时间 >= ts 的记录下标"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _RECORD.unpack_from(index, mid * _RECORD.size)[0] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _open_index(self):
+        count = len(self)
+        if not count:
+            return 0, None
+        with open(self.index_path, 'rb') as f:
+            return count, mmap.mmap(f.fileno(), count * _RECORD.size, access=mmap.ACCESS_READ)
+
+    def scan(self, start=None, end=None):
+        """按时间顺序返回 [start, end) 内的所有抓取记录 (ts, 摘要)，用二分查找定位起点"""
+        count, index = self._open_index()
+        if index is None:
+            return
+        with index:
+            lo = 0 if start is None else self._bisect(index, count, start)
+            for i in range(lo, count):
+                ts, digest = _RECORD.unpack_from(index, i * _RECORD.size)
+                if end is not None and ts >= end:
+                    break
+                yield ts, digest.hex()
+
+    def pages(self, start=None, end=None):
+        """按时间顺序返回 [start, end) 内的 (ts, 页面内容)，连续相同的页面只解压一次"""
+        last_digest = None
+        html = None
+        for ts, hexdigest in self.scan(start, end):
+            if hexdigest != last_digest:
+                html = self.get(hexdigest)
+                last_digest = hexdigest
+            yield ts, html
+
+    def page_at(self, ts):
+        """返回在 ts 时刻或之前最近一次抓取到的 (ts, 页面内容)，没有则返回None"""
+        count, index = self._open_index()
+        if index is None:
+            return None
+        with index:
+            # 第一条晚于 ts 的记录的前一条
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _RECORD.unpack_from(index, mid * _RECORD.size)[0] <= ts:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0:
+                return None
+            found_ts, digest = _RECORD.unpack_from(index, (lo - 1) * _RECORD.size)
+        return found_ts, self.get(digest.hex())
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查看原始页面归档")
+    parser.add_argument('root', help="归档目录")
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_cmd = sub.add_parser('list', help="列出时间范围内的抓取记录")
+    list_cmd.add_argument('--since', help="开始时间（ISO格式，如 2025-11-23T08:00）")
+    list_cmd.add_argument('--until', help="结束时间（ISO格式）")
+    cat_cmd = sub.add_parser('cat', help="输出某一时刻的页面")
+    cat_cmd.add_argument('time', help="时间（ISO格式）或页面摘要")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        print(f"归档目录不存在: {args.root}", file=sys.stderr)
+        return 1
+    # 只读打开，不影响正在写入归档的监控进程
+    archive = PageArchive(args.root, read_only=True)
+    if args.command == 'list':
+        unique = set()
+        for ts, hexdigest in archive.scan(_parse_time(args.since), _parse_time(args.until)):
+            unique.add(hexdigest)
+            print(f"{datetime.fromtimestamp(ts).isoformat(timespec='seconds')}  {hexdigest}")
+        print(f"共 {len(unique)} 个不同页面", file=sys.stderr)
+        return 0
+
+    if len(args.time) == 64 and all(c in '0123456789abcdef' for c in args.time):
+        sys.stdout.write(archive.get(args.time))
+        return 0
+    found = archive.page_at(_parse_time(args.time))
+    if found is None:
+        print("该时间之前没有归档页面", file=sys.stderr)
+        return 1
+    sys.stdout.write(found[1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
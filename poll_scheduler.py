@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+自适应轮询调度
+根据当前比赛状态决定下一次抓取的时间：关键时刻几秒一次，前几节几分钟一次，
+没有进行中的比赛时长时间休眠，同时保证请求间隔不低于设定的下限。
+另外按比赛时钟外推每场比赛进入关键时刻的时间点，并在该时刻安排一次抓取
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PERIOD_LENGTH = 720  # 常规节时长（秒）
+REGULAR_PERIODS = {'Q1': 1, 'Q2': 2, 'Q3': 3}
+
+
+def is_live(game):
+    """比赛是否正在进行"""
+    status = game.get('status') or ''
+    if '进行中' in status:
+        return True
+    if '结束' in status or '未开始' in status:
+        return False
+    return game.get('period') is not None
+
+
+def is_late_period(game):
+    """比赛是否处于第四节或加时赛"""
+    return game.get('period') in ('Q4', 'OT')
+
+
+def game_key(game):
+    """比赛在一天赛程内的标识"""
+    return (game.get('team1'), game.get('team2'))
+
+
+def clock_seconds_until_clutch(game, time_threshold):
+    """比赛时钟还需走多少秒才进入第四节/加时的关键时刻（已在关键时刻内返回0，无法判断返回None）
+
+    节间休息和暂停只会让实际时间更长，因此按比赛时钟与现实时间1:1计算得到的是最早可能时间
+    """
+    time_remaining = game.get('time_remaining')
+    period = game.get('period')
+    if time_remaining is None or period is None:
+        return None
+    if is_late_period(game):
+        return max(time_remaining - time_threshold, 0)
+    periods_left = 3 - REGULAR_PERIODS[period]
+    return time_remaining + periods_left * PERIOD_LENGTH + PERIOD_LENGTH - time_threshold
+
+
+class PollScheduler:
+    """基于比赛状态的轮询调度器
+
+    time_threshold 可以是数值，也可以是返回阈值的函数（每次计算间隔时读取，提醒条件变化后立即生效）
+    """
+
+    def __init__(self, time_threshold=120, clutch_interval=5, late_interval=30,
+                 early_interval=120, idle_interval=600, min_interval=3, clutch_margin=0,
+                 lead_time=2):
+        self._time_threshold = time_threshold  # 提醒的剩余时间阈值（秒），或返回阈值的函数
+        self.clutch_interval = clutch_interval  # 第四节/加时接近阈值时的间隔
+        self.late_interval = late_interval  # 第四节/加时其余时间的间隔
+        self.early_interval = early_interval  # 前三节的间隔
+        self.idle_interval = idle_interval  # 没有进行中比赛时的间隔
+        self.min_interval = min_interval  # 两次请求之间的最小间隔（请求频率上限）
+        self.clutch_margin = clutch_margin  # 剩余时间距阈值多少秒内进入密集轮询
+        self.lead_time = lead_time  # 预测进入关键时刻的抓取提前量（秒），抵消页面更新延迟
+        self.last_poll = None  # 最近一次请求的单调时钟时间
+        # 每场进行中比赛的时钟观测：game_key -> (节次, 剩余时间, 首次看到该时钟的时间, 最近看到该时钟的时间)
+        self.observations = {}
+
+    @property
+    def time_threshold(self):
+        threshold = self._time_threshold
+        return threshold() if callable(threshold) else threshold
+
+    @time_threshold.setter
+    def time_threshold(self, value):
+        self._time_threshold = value
+
+    def mark_poll(self):
+        """记录一次请求的发起时间"""
+        self.last_poll = time.monotonic()
+
+    def observe(self, games):
+        """记录本次解析到的比赛时钟（时钟未变化时保留首次看到的时间，外推更保守）"""
+        now = time.monotonic()
+        observations = {}
+        for game in games or ():
+            if not is_live(game):
+                continue
+            key = game_key(game)
+            clock = (game.get('period'), game.get('time_remaining'))
+            previous = self.observations.get(key)
+            if previous is not None and previous[:2] == clock:
+                observations[key] = previous[:3] + (now,)
+            else:
+                observations[key] = clock + (now, now)
+        self.observations = observations
+
+    def seconds_until_clutch(self):
+        """按时钟外推，距离最早一场比赛进入关键时刻还有多少秒（没有可预测的比赛时返回None）"""
+        now = time.monotonic()
+        earliest = None
+        time_threshold = self.time_threshold
+        for (team1, team2), (period, time_remaining, seen_at, last_seen) in self.observations.items():
+            clock_left = clock_seconds_until_clutch(
+                {'period': period, 'time_remaining': time_remaining}, time_threshold)
+            if not clock_left:
+                # 无法预测，或已在关键时刻内（由 policy_interval 处理）
+                continue
+            wait = seen_at + clock_left - self.lead_time - now
+            if wait <= 0 and last_seen > seen_at:
+                # 预测时刻已过而时钟仍未变化（暂停、节间休息）：从最近一次看到该时钟时重新外推，
+                # 且至少间隔 clutch_interval，避免每 min_interval 秒抓取一次
+                wait = last_seen + max(clock_left - self.lead_time, self.clutch_interval) - now
+            if earliest is None or wait < earliest:
+                earliest = wait
+                logger.debug(f"预计 {team1} vs {team2} 在 {max(wait, 0):.0f} 秒后进入关键时刻")
+        return None if earliest is None else max(earliest, 0.0)
+
+    def policy_interval(self, games):
+        """仅根据比赛状态计算的轮询间隔（秒）"""
+        interval = self.idle_interval
+        time_threshold = self.time_threshold
+
+        for game in games or ():
+            if not is_live(game):
+                continue
+            if is_late_period(game):
+                time_remaining = game.get('time_remaining')
+                if time_remaining is not None and \
+                        time_remaining <= time_threshold + self.clutch_margin:
+                    return self.clutch_interval
+                interval = min(interval, self.late_interval)
+            else:
+                interval = min(interval, self.early_interval)
+
+        return interval
+
+    def next_interval(self, games):
+        """距离下一次请求还需等待的秒数
+
+        取状态轮询间隔与预测进入关键时刻时间中较早者，从上次请求发起时算起，且不低于请求间隔下限
+        """
+        elapsed = 0.0 if self.last_poll is None else time.monotonic() - self.last_poll
+        delay = self.policy_interval(games) - elapsed
+        until_clutch = self.seconds_until_clutch()
+        if until_clutch is not None:
+            delay = min(delay, until_clutch)
+        return max(delay, self.min_interval - elapsed, 0.0)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+界面刷新工作线程
+手机应用只用一个常驻线程抓取和解析页面：刷新请求合并执行，同一时间最多一个请求在进行；
+结果通过 post（界面中为 Clock.schedule_once）回到界面线程；停止后立即生效，进行中的请求结果被丢弃。
+不依赖Kivy，可以在普通Linux环境中测试
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshWorker:
+    """单线程、不重叠的刷新流水线
+
+    on_games(games) 和 on_status(text) 都通过 post(func) 投递，由调用方保证在界面线程执行
+    """
+
+    def __init__(self, core, on_games, on_status=None, post=None):
+        self.core = core  # reminder_core.ReminderCore
+        self.on_games = on_games
+        self.on_status = on_status
+        self.post = post or (lambda func: func())
+        self.auto = False  # 是否按调度器自动刷新（监控开关）
+
+        self._cond = threading.Condition()
+        self._requested = False
+        self._in_flight = False
+        self._generation = 0  # 停止/关闭自动刷新时加一，旧请求的结果作废
+        self._job_generation = 0  # 进行中请求的代号
+        self._stopped = False
+        self._thread = None
+
+    def _ensure_started(self):
+        # 调用方持有锁
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='nba-refresh', daemon=True)
+            self._thread.start()
+
+    def request(self):
+        """请求立即刷新；已有有效请求在进行时直接沿用它的结果，进行中的请求已作废时在它之后再刷新一次"""
+        with self._cond:
+            if self._stopped:
+                return
+            if not self._in_flight or self._job_generation != self._generation:
+                self._requested = True
+            self._ensure_started()
+            self._cond.notify()
+
+    def set_auto(self, enabled):
+        """打开/关闭按比赛状态自动刷新；关闭时丢弃进行中请求的结果"""
+        with self._cond:
+            self.auto = enabled
+            if enabled:
+                self._requested = True
+                self._ensure_started()
+            else:
+                self._requested = False
+                self._generation += 1
+            self._cond.notify()
+
+    def stop(self):
+        """停止工作线程（立即返回，不等待进行中的请求）"""
+        with self._cond:
+            self._stopped = True
+            self._generation += 1
+            self._cond.notify()
+
+    @property
+    def busy(self):
+        return self._in_flight
+
+    def _next_job(self):
+        """等待下一次刷新，返回本次请求的代号；已停止时返回None"""
+        scheduler = self.core.scheduler
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if self._requested:
+                    break
+                if self.auto:
+                    delay = scheduler.next_interval(self.core.current_games)
+                    if delay <= 0:
+                        break
+                    # 调度间隔随比赛状态变化，最多等待1秒后重新计算
+                    self._cond.wait(min(delay, 1.0))
+                else:
+                    self._cond.wait()
+            self._requested = False
+            self._in_flight = True
+            self._job_generation = self._generation
+            return self._generation
+
+    def _is_stale(self, generation):
+        with self._cond:
+            return generation != self._generation
+
+    def _run(self):
+        while True:
+            generation = self._next_job()
+            if generation is None:
+                return
+            try:
+                games, status = self._refresh(generation)
+            except Exception as e:
+                logger.error(f"刷新比赛数据出错: {e}")
+                games, status = None, "状态: 获取失败"
+            finally:
+                with self._cond:
+                    self._in_flight = False
+                    stale = generation != self._generation
+
+            if stale:
+                logger.debug("刷新已取消，丢弃结果")
+                continue
+            if games is not None:
+                self.post(lambda games=games: self.on_games(games))
+            if self.on_status is not None:
+                self.post(lambda status=status: self.on_status(status))
+
+    def _refresh(self, generation):
+        """抓取并解析一次，返回 (比赛列表或None, 状态文字)；请求已作废时不更新核心状态"""
+        core = self.core
+        core.scheduler.mark_poll()
+        html = core.fetch_games()
+        if html:
+            games = core.parse_game_info(html)
+            if self._is_stale(generation):
+                return None, None
+            core.ingest(games)
+            return games, f"状态: 已更新 ({len(games)}场比赛)"
+        if core.last_fetch is not None and core.last_fetch.not_modified:
+            return None, "状态: 比赛数据无变化"
+        return None, "状态: 获取失败"
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+NBA提醒核心逻辑
+桌面命令行（nba_game_reminder.py）和手机应用（nba_reminder_app.py）共用的抓取、解析、检测和提醒记录；
+requests、lxml/bs4 等较重的依赖在第一次抓取/解析时才导入，导入本模块不会加载它们
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import metrics
+from clutch_score import ClutchTracker
+from game_events import (ChangeCapture, EnteredClutchWindow, EventBus, GameAdded, GameRemoved, GameUpdated,
+                         LeftClutchWindow)
+from game_parser import BoxCache, get_parser_backend
+from game_timeline import TimelineTracker
+from game_record import Game
+from notification_dispatcher import COALESCED, MERGED, QUEUED, NotificationDispatcher
+from notification_store import NotificationStore
+from poll_scheduler import PollScheduler
+from rule_engine import GameColumns, Rule, RuleSet
+
+logger = logging.getLogger(__name__)
+
+HUPU_GAMES_URL = "https://nba.hupu.com/games"
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+
+class ReminderCore:
+    """比赛抓取、解析、提醒条件检测和提醒记录；子类实现 _notify 以接入具体的通知方式
+
+    state_dir 为提醒记录文件所在的目录（默认当前目录）
+    """
+
+    def __init__(self, state_dir=''):
+        self.url = HUPU_GAMES_URL
+        self.headers = {'User-Agent': USER_AGENT}
+        self._fetcher = None  # 第一次抓取时创建（导入requests）
+        self.last_fetch = None  # 最近一次抓取结果（含状态码和各阶段耗时）
+        self.last_fetch_time = None  # 最近一次开始抓取的时间（Unix秒），即随后解析出的快照的时间
+        self.PARSER_BACKEND = None  # 解析引擎名称，None 表示自动选择最快的引擎
+        self._parser = None  # 第一次解析时创建（导入lxml/bs4）
+        self.box_cache = BoxCache()  # 按盒子内容指纹缓存提取结果
+        self.state_file = os.path.join(state_dir, 'nba_reminder_state.jsonl')  # 提醒记录的追加日志文件
+        self.legacy_state_file = os.path.join(state_dir, 'nba_reminder_state.json')  # 旧版本的状态文件，第一次启动时导入
+        self.notification_store = NotificationStore(self.state_file)  # 记录已提醒的比赛（按有效期淘汰）
+        self.game_dates = {}  # (球队1, 球队2) -> 第一次看到该比赛的日期，比赛跨过午夜时标识不变
+
+        # 加载之前的状态
+        self.load_state()
+
+        # 配置参数
+        self.TIME_THRESHOLD = 120  # 剩余时间阈值（秒），2分钟
+        self.SCORE_DIFF_THRESHOLD = 5  # 分差阈值
+        self.MIN_POLL_INTERVAL = 3  # 两次请求之间的最小间隔（秒）
+        self.ALERT_RULES = None  # 自定义提醒规则（保存为 rule_engine.Rule 元组），None 时按上面两个阈值提醒
+        self._compiled_rules = None  # (编译时的配置, RuleSet)
+
+        # 根据比赛状态决定轮询间隔；剩余时间阈值每次从当前的提醒规则读取（阈值或 ALERT_RULES 变化后立即生效）
+        self.scheduler = PollScheduler(time_threshold=lambda: self.rules.clutch_clock,
+                                       min_interval=self.MIN_POLL_INTERVAL)
+        self.current_games = []  # 最近一次解析到的比赛（页面未变化时沿用）
+        self.clutch = ClutchTracker()  # 每场比赛的紧张度（0~1），每次解析后增量更新
+        self.timeline = TimelineTracker()  # 每场比赛的比分时间线（领先易主、追平、得分攻势）
+        self.events = EventBus()  # 比赛状态变化事件（game_events），日志等按需订阅
+        self.changes = ChangeCapture(lambda game: self.check_game_condition(game))
+        self.recorder = None  # 快照录制器（game_recording.SnapshotRecorder），为None时不录制
+        self.archive = None  # 原始页面归档（page_archive.PageArchive），为None时不归档
+        self.hub = None  # 分发服务（fanout_server.GameHub），为None时不向订阅端推送
+        self.subscriptions = None  # 多用户订阅（subscriptions.SubscriptionIndex），为None时只按本机规则提醒
+        self.condition_first_met = {}  # game_key -> 首次满足提醒条件的快照时间（Unix秒），用于统计检测延迟
+        # 通知在后台线程发送，不阻塞检测；队列满被丢弃的提醒撤销已提醒记录，下次轮询重新提醒
+        self.dispatcher = NotificationDispatcher(lambda game: self.send_notification(game),
+                                                 coalesce_window=30,
+                                                 on_drop=lambda key, game: self.drop_alert(key))
+
+    @property
+    def NOTIFY_COALESCE_WINDOW(self):
+        """同一场比赛两次提醒的最短间隔（秒），直接读写通知队列的设置"""
+        return self.dispatcher.coalesce_window
+
+    @NOTIFY_COALESCE_WINDOW.setter
+    def NOTIFY_COALESCE_WINDOW(self, value):
+        self.dispatcher.coalesce_window = value
+
+    @property
+    def fetcher(self):
+        """页面抓取器（复用连接并支持条件请求）"""
+        if self._fetcher is None:
+            from http_fetcher import PageFetcher
+            self._fetcher = PageFetcher(self.url, headers=self.headers)
+        return self._fetcher
+
+    @property
+    def parser(self):
+        """解析引擎"""
+        if self._parser is None:
+            self._parser = get_parser_backend(self.PARSER_BACKEND)
+        return self._parser
+
+    @parser.setter
+    def parser(self, backend):
+        # 不同引擎的盒子指纹不通用
+        self._parser = backend
+        self.box_cache.clear()
+
+    @property
+    def ALERT_RULES(self):
+        return self._alert_rules
+
+    @ALERT_RULES.setter
+    def ALERT_RULES(self, rules):
+        # 保存为元组：不能原地增删规则（编译结果按对象判断是否过期），修改时重新赋值
+        self._alert_rules = None if rules is None else tuple(rules)
+
+    @property
+    def rules(self):
+        """编译后的提醒规则（阈值或 ALERT_RULES 变化后重新编译）"""
+        config = (self.TIME_THRESHOLD, self.SCORE_DIFF_THRESHOLD, self.ALERT_RULES)
+        compiled = self._compiled_rules
+        if compiled is None or compiled[0][:2] != config[:2] or compiled[0][2] is not config[2]:
+            rules = self.ALERT_RULES
+            if rules is None:
+                rules = [Rule.default(self.TIME_THRESHOLD, self.SCORE_DIFF_THRESHOLD)]
+            compiled = self._compiled_rules = (config, RuleSet(rules))
+        return compiled[1]
+
+    def load_state(self):
+        """加载之前提醒过的比赛状态"""
+        try:
+            if not os.path.exists(self.state_file) and os.path.exists(self.legacy_state_file):
+                self._migrate_legacy_state()
+            self.notification_store.load()
+            logger.info(f"已加载 {len(self.notification_store)} 场已提醒的比赛记录")
+        except Exception as e:
+            logger.error(f"加载状态文件失败: {e}")
+
+    def _migrate_legacy_state(self):
+        """导入旧版本 nba_reminder_state.json 中的提醒记录（比赛标识按文件的最后更新日期）"""
+        with open(self.legacy_state_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        try:
+            updated = datetime.fromisoformat(data['last_update']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            updated = os.path.getmtime(self.legacy_state_file)
+        day = date.fromtimestamp(updated).isoformat()
+
+        # 旧文件记录了每个提醒过的状态，新记录每场比赛只保留一个：取比分最高（最晚）的状态
+        latest = {}
+        for game_id in data.get('notified_games', []):
+            parts = game_id.split('_')
+            if len(parts) != 6:
+                continue
+            key = f"{day}_{parts[0]}_{parts[1]}"
+            total = sum(int(score) for score in parts[2:4] if score.isdigit())
+            if key not in latest or total >= latest[key][0]:
+                latest[key] = (total, game_id)
+        for key, (_, game_id) in latest.items():
+            self.notification_store.mark_notified(key, game_id, now=updated)
+        logger.info(f"已从 {self.legacy_state_file} 导入 {len(latest)} 场比赛的提醒记录")
+
+    def save_state(self):
+        """保存提醒状态（提醒时已追加写入日志，这里只淘汰过期记录并压缩日志）"""
+        try:
+            self.notification_store.compact()
+        except Exception as e:
+            logger.error(f"保存状态文件失败: {e}")
+
+    def fetch_games(self):
+        """从虎扑获取NBA比赛数据（页面未变化或获取失败时返回None，详见 last_fetch）"""
+        self.last_fetch_time = time.time()
+        self.last_fetch = self.fetcher.fetch()
+        metrics.FETCH_REQUESTS.labels(self.last_fetch.status or 'error').inc()
+        for phase, seconds in self.last_fetch.timings.items():
+            metrics.FETCH_DURATION.labels(phase).observe(seconds)
+        if self.archive is not None and self.last_fetch.text is not None:
+            try:
+                self.archive.store(self.last_fetch.text)
+            except OSError as e:
+                logger.error(f"归档页面失败: {e}")
+        return self.last_fetch.text
+
+    def parse_game_info(self, html):
+        """解析HTML，提取比赛信息"""
+        games = []
+        start = time.perf_counter()
+
+        try:
+            # 虎扑NBA比赛结构：每个比赛在 <div class="list_box"> 中
+            parser = self.parser
+            game_boxes = parser.find_boxes(html)
+
+            # 解析每个比赛盒子（内容未变化的盒子直接复用上次的提取结果）
+            for game_info in self.box_cache.extract_all(parser, game_boxes):
+                if game_info and game_info.score1 is not None:
+                    games.append(game_info)
+
+            cache = self.box_cache
+            if cache.last_hits + cache.last_misses:
+                logger.info(f"找到 {len(game_boxes)} 个比赛盒子"
+                            f"（缓存命中 {cache.last_hits}/{len(game_boxes)}，累计命中率 {cache.hit_rate:.0%}）")
+            else:
+                logger.info(f"找到 {len(game_boxes)} 个比赛盒子")
+            metrics.BOX_CACHE.labels('hit').inc(cache.last_hits)
+            metrics.BOX_CACHE.labels('miss').inc(cache.last_misses)
+
+            if not games:
+                logger.warning("未能从页面中找到比赛数据，可能需要检查网页结构")
+
+        except Exception as e:
+            logger.error(f"解析HTML失败: {e}")
+
+        metrics.PARSE_DURATION.observe(time.perf_counter() - start)
+        metrics.PARSE_GAMES.set(len(games))
+        return games
+
+    def extract_game_data_from_box(self, box):
+        """从比赛盒子中提取比赛数据（针对虎扑网站结构）"""
+        return self.parser.extract(box)
+
+    def check_game_condition(self, game):
+        """检查比赛是否满足提醒条件（任一提醒规则）"""
+        return bool(self.rules.evaluate([game])[0])
+
+    def get_game_id(self, game):
+        """生成比赛唯一标识"""
+        game = Game.coerce(game)
+        # 使用球队名称和比分生成唯一ID
+        return f"{game.team1}_{game.team2}_{game.score1}_{game.score2}_{game.period}_{game.clock}"
+
+    def get_game_key(self, game):
+        """生成比赛的稳定标识（比赛日期+球队），不随比分和时间变化
+
+        日期为第一次看到该比赛的日期（ingest 时记录），比赛进行到午夜之后标识不变
+        """
+        game = Game.coerce(game)
+        teams = (game.team1, game.team2)
+        game_date = self.game_dates.get(teams)
+        if game_date is None:
+            game_date = self._first_seen_date(teams, date.today())
+        return f"{game_date}_{game.team1}_{game.team2}"
+
+    def _first_seen_date(self, teams, today):
+        # 重启后：前一天开始的比赛已有提醒记录时沿用前一天的日期
+        yesterday = (today - timedelta(days=1)).isoformat()
+        if f"{yesterday}_{teams[0]}_{teams[1]}" in self.notification_store:
+            return yesterday
+        return today.isoformat()
+
+    def track_game_dates(self, games, now=None):
+        """记录页面上每场比赛第一次出现的日期；不再出现的比赛被移除"""
+        today = date.fromtimestamp(time.time() if now is None else now)
+        dates = {}
+        for game in map(Game.coerce, games):
+            teams = (game.team1, game.team2)
+            dates[teams] = self.game_dates.get(teams) or self._first_seen_date(teams, today)
+        self.game_dates = dates
+
+    def is_notified(self, game):
+        """该比赛在当前状态下是否已提醒过"""
+        return self.notification_store.is_notified(self.get_game_key(game), self.get_game_id(game))
+
+    def mark_notified(self, game):
+        """记录已提醒的比赛状态（追加写入日志）"""
+        self.notification_store.mark_notified(self.get_game_key(game), self.get_game_id(game))
+
+    def pending_alerts(self, games):
+        """逐个返回满足提醒条件且尚未提醒过的比赛 (game_id, game)"""
+        columns = GameColumns(games)
+        for game, mask in zip(columns.games, self.rules.evaluate(columns)):
+            if mask:
+                game_id = self.get_game_id(game)
+
+                # 避免重复提醒（同一场比赛在相同状态下）
+                if not self.notification_store.is_notified(self.get_game_key(game), game_id):
+                    # 通常在 ingest 中已按快照时间记录；规则变化等没有产生事件的情况从现在开始计
+                    self.condition_first_met.setdefault(self.get_game_key(game), time.time())
+                    yield game_id, game
+                else:
+                    logger.debug(f"比赛 {game.team1} vs {game.team2} 已提醒过，跳过")
+
+    def ingest(self, games, now=None):
+        """接收一次解析结果：更新调度器、紧张度和时间线，发布状态变化事件，推送给分发服务和订阅用户，并录制快照
+
+        now 为快照时间（Unix秒，默认为最近一次开始抓取的时间，回放时为录制时的时间）；返回本次的状态变化事件
+        """
+        if now is None:
+            now = self.last_fetch_time if self.last_fetch_time is not None else time.time()
+        self.current_games = games
+        self.track_game_dates(games, now)
+        self.scheduler.observe(games)
+        self.clutch.update(games)
+        events = self.changes.diff(games)
+        for event in events:
+            # 检测延迟从比赛首次满足提醒条件的快照算起，包含轮询间隔、抓取和解析的耗时
+            if isinstance(event, EnteredClutchWindow):
+                self.condition_first_met.setdefault(self.get_game_key(event.game), now)
+            elif isinstance(event, (LeftClutchWindow, GameRemoved)):
+                self.condition_first_met.pop(self.get_game_key(event.game), None)
+        self.events.publish_all(events)
+        if self.hub is not None and events:
+            updated = [event.game for event in events if isinstance(event, (GameAdded, GameUpdated))]
+            removed = [event.game for event in events if isinstance(event, GameRemoved)]
+            self.hub.publish_changes(updated, removed)
+        for event in self.timeline.update(games, now=now):
+            self.publish_moment(event)
+        self.notify_subscribers(games)
+        if self.recorder is not None:
+            self.recorder.record(games, ts=now)
+        return events
+
+    def submit_alert(self, game):
+        """把提醒放入通知队列（紧张度高的比赛先发送），返回 dispatcher.submit 的结果
+
+        只有加入队列（QUEUED/MERGED）的提醒记录为已提醒；合并窗口内或被丢弃的状态变化下次轮询仍会检测
+        """
+        game_key = self.get_game_key(game)
+        result = self.dispatcher.submit(game_key, game, priority=self.clutch.score(game))
+        if result in (QUEUED, MERGED):
+            self.mark_notified(game)
+        elif result == COALESCED:
+            self.condition_first_met.pop(game_key, None)
+        return result
+
+    def drop_alert(self, game_key):
+        """通知队列满而丢弃的提醒：撤销已提醒记录（下次轮询重新提醒），不再统计它的检测延迟"""
+        self.notification_store.forget(game_key)
+        self.condition_first_met.pop(game_key, None)
+
+    def publish_alert(self, game):
+        """通过分发服务向所有订阅端推送提醒（附带紧张度）"""
+        if self.hub is not None:
+            self.hub.publish_alert(game, clutch=self.clutch.score(game))
+
+    def publish_moment(self, event):
+        """最后几分钟的领先易主、追平、得分攻势：写入日志并推送给订阅端"""
+        logger.info(f"📈 {event.describe()}")
+        if self.hub is not None:
+            self.hub.publish_moment(event)
+
+    def notify_subscribers(self, games):
+        """按多用户订阅向分发服务推送提醒（每个用户分别去重），返回推送条数"""
+        if self.subscriptions is None:
+            return 0
+        alerts = self.subscriptions.match(games)
+        if alerts and self.hub is not None:
+            self.hub.publish_user_alerts([(subscriber_id, game, self.clutch.score(game))
+                                          for subscriber_id, game in alerts])
+        if alerts:
+            logger.info(f"向 {len(alerts)} 个订阅推送了提醒")
+        return len(alerts)
+
+    def send_notification(self, game):
+        """发送通知，并记录发送耗时和检测延迟指标"""
+        game = Game.coerce(game)
+        start = time.perf_counter()
+        sent = self._notify(game)
+        metrics.NOTIFY_DURATION.observe(time.perf_counter() - start)
+        metrics.NOTIFICATIONS.labels('sent' if sent else 'failed').inc()
+
+        first_met = self.condition_first_met.pop(self.get_game_key(game), None)
+        if first_met is not None:
+            metrics.DETECTION_LAG.observe(max(time.time() - first_met, 0.0))
+        return sent
+
+    def _notify(self, game):
+        """发送通知，成功返回True；没有可用的通知方式时只写日志"""
+        logger.warning(f"检测到关键时刻: {game.team1} {game.score1} - {game.score2} {game.team2}")
+        return False
+
+    def close(self):
+        """发送完排队的通知，保存状态并释放连接"""
+        self.dispatcher.close()
+        self.save_state()
+        if self._fetcher is not None:
+            self._fetcher.close()
+        if self.recorder is not None:
+            self.recorder.close()
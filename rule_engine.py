@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+提醒规则引擎
+规则是声明式的条件组合（球队、节次、剩余时间窗口、分差窗口），一次编译成按取值索引的位掩码表；
+当前全部比赛先转换为列式数组（array模块），每场比赛只需查表并按位与，耗时与规则数量基本无关
+
+    rules = RuleSet([Rule('默认'), Rule('湖人平局', teams=['湖人'], margin=(0, 0), clock=None)])
+    for game, names in rules.match(games):
+        ...
+"""
+
+import json
+from array import array
+
+from game_record import Game, Period
+from poll_scheduler import PERIOD_LENGTH
+
+# 节次列的编码：0 表示未知节次
+_PERIOD_CODES = {period: int(period) for period in Period}
+_NO_PERIOD = 0
+_MISSING = -1  # 剩余时间/分差未知
+
+
+class Rule:
+    """一条提醒规则，None 表示不限制该条件
+
+    teams   只对这些球队（任一方）的比赛生效
+    periods 生效的节次（Period 或 'Q4'/'OT' 等标签）
+    clock   本节剩余时间窗口 (最少秒数, 最多秒数)，包含两端
+    margin  分差窗口 (最小分差, 最大分差)，包含两端；(0, 0) 即平局
+    """
+
+    __slots__ = ('name', 'teams', 'periods', 'clock', 'margin')
+
+    def __init__(self, name, teams=None, periods=(Period.Q4, Period.OT), clock=(0, 120), margin=(0, 4)):
+        self.name = name
+        self.teams = None if teams is None else frozenset(teams)
+        self.periods = None if periods is None else frozenset(_parse_period(p) for p in periods)
+        self.clock = None if clock is None else _window(clock)
+        self.margin = None if margin is None else _window(margin)
+
+    @classmethod
+    def from_dict(cls, data):
+        """从配置字典创建，例如 {"name": "加时平局", "periods": ["OT"], "margin": [0, 0], "clock": null}"""
+        kwargs = {key: data[key] for key in ('teams', 'periods', 'clock', 'margin') if key in data}
+        return cls(data['name'], **kwargs)
+
+    @classmethod
+    def default(cls, time_threshold=120, score_diff_threshold=5):
+        """原有的提醒条件：第四节/加时赛，剩余时间 ≤ time_threshold 秒，分差 < score_diff_threshold"""
+        return cls('关键时刻', clock=(0, time_threshold), margin=(0, score_diff_threshold - 1))
+
+    def matches(self, game):
+        """逐场判断（不经过编译，用于核对）"""
+        game = Game.coerce(game)
+        if self.teams is not None and game.team1 not in self.teams and game.team2 not in self.teams:
+            return False
+        if self.periods is not None and game.period not in self.periods:
+            return False
+        if self.clock is not None and not _in_window(game.clock, self.clock):
+            return False
+        if self.margin is not None:
+            if game.score1 is None or game.score2 is None:
+                return False
+            if not _in_window(game.score_diff, self.margin):
+                return False
+        return True
+
+    def __repr__(self):
+        return (f"Rule({self.name!r}, teams={self.teams}, periods={self.periods}, "
+                f"clock={self.clock}, margin={self.margin})")
+
+
+def _parse_period(period):
+    parsed = Period.parse(period)
+    if parsed is None:
+        raise ValueError(f"无法识别的节次: {period}")
+    return parsed
+
+
+def _in_window(value, window):
+    low, high = window
+    return value is not None and value >= low and (high is None or value <= high)
+
+
+def _window(bounds):
+    low, high = bounds
+    low = 0 if low is None else int(low)
+    if high is not None and int(high) < low:
+        raise ValueError(f"无效的区间: {bounds}")
+    return low, None if high is None else int(high)
+
+
+class GameColumns:
+    """当前全部比赛的列式表示：节次编码、剩余时间、分差为紧凑整数数组，缺失值为 -1"""
+
+    __slots__ = ('games', 'team1', 'team2', 'period', 'clock', 'margin')
+
+    def __init__(self, games):
+        self.games = [Game.coerce(game) for game in games]
+        self.team1 = [game.team1 for game in self.games]
+        self.team2 = [game.team2 for game in self.games]
+        self.period = array('b', (_PERIOD_CODES.get(game.period, _NO_PERIOD) for game in self.games))
+        self.clock = array('l', (_MISSING if game.clock is None else game.clock for game in self.games))
+        self.margin = array('l', (_MISSING if game.score1 is None or game.score2 is None else game.score_diff
+                                  for game in self.games))
+
+    def __len__(self):
+        return len(self.games)
+
+
+class _WindowTable:
+    """整数取值 -> 位掩码（包含该取值的规则）；超出所有区间端点的取值共用最后一格"""
+
+    def __init__(self, windows):
+        # windows: [(规则位, (low, high) 或 None)]
+        bounds = [bound for _, window in windows if window is not None for bound in window if bound is not None]
+        self.size = max(bounds, default=0) + 2
+        self.any_value = 0  # 不限制该条件的规则
+        table = [0] * self.size
+        for bit, window in windows:
+            if window is None:
+                self.any_value |= bit
+                continue
+            low, high = window
+            top = self.size - 1 if high is None else high
+            for value in range(min(low, self.size - 1), top + 1):
+                table[value] |= bit
+        self.table = [mask | self.any_value for mask in table]
+
+    def lookup(self, value):
+        if value < 0:
+            return self.any_value
+        return self.table[value if value < self.size else self.size - 1]
+
+
+class RuleSet:
+    """编译后的规则集合，规则按列表顺序对应掩码中的第 0、1、2… 位"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        bits = [1 << i for i in range(len(self.rules))]
+
+        self._period = [0] * (max(_PERIOD_CODES.values()) + 1)
+        self._any_team = 0
+        self._teams = {}  # 球队 -> 只对该球队生效的规则
+        for bit, rule in zip(bits, self.rules):
+            for code in range(len(self._period)):
+                if rule.periods is None or (code != _NO_PERIOD and Period(code) in rule.periods):
+                    self._period[code] |= bit
+            if rule.teams is None:
+                self._any_team |= bit
+            else:
+                for team in rule.teams:
+                    self._teams[team] = self._teams.get(team, 0) | bit
+        self._clock = _WindowTable([(bit, rule.clock) for bit, rule in zip(bits, self.rules)])
+        # 第四节/加时中最早开始生效的剩余时间，轮询调度器据此预测比赛何时进入提醒范围
+        self.clutch_clock = max((PERIOD_LENGTH if rule.clock is None or rule.clock[1] is None else rule.clock[1]
+                                 for rule in self.rules
+                                 if rule.periods is None or rule.periods & {Period.Q4, Period.OT}), default=0)
+        self._margin = _WindowTable([(bit, rule.margin) for bit, rule in zip(bits, self.rules)])
+
+    def __len__(self):
+        return len(self.rules)
+
+    def evaluate(self, columns):
+        """返回每场比赛满足的规则掩码（按比赛顺序）"""
+        if not isinstance(columns, GameColumns):
+            columns = GameColumns(columns)
+        period_masks, teams, any_team = self._period, self._teams, self._any_team
+        clock, margin = self._clock.lookup, self._margin.lookup
+        return [period_masks[p] & clock(c) & margin(m) & (any_team | teams.get(t1, 0) | teams.get(t2, 0))
+                for p, c, m, t1, t2 in zip(columns.period, columns.clock, columns.margin,
+                                           columns.team1, columns.team2)]
+
+    def rules_for(self, mask):
+        """掩码对应的规则列表"""
+        rules = []
+        while mask:
+            low = mask & -mask
+            rules.append(self.rules[low.bit_length() - 1])
+            mask ^= low
+        return rules
+
+    def match(self, games):
+        """逐个返回满足至少一条规则的比赛 (game, 规则名称列表)"""
+        columns = games if isinstance(games, GameColumns) else GameColumns(games)
+        for game, mask in zip(columns.games, self.evaluate(columns)):
+            if mask:
+                yield game, [rule.name for rule in self.rules_for(mask)]
+
+
+def load_rules(path):
+    """从JSON文件加载规则列表（每项为 Rule.from_dict 接受的字典）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [Rule.from_dict(item) for item in json.load(f)]
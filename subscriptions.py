@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多用户订阅索引
+一个轮询进程为大量用户服务，每个用户有自己的关注球队和提醒阈值（一条 rule_engine.Rule）；
+订阅按规则条件（节次、剩余时间、分差窗口）分桶，桶内再按球队索引。每次轮询只检查状态变化的比赛：
+先用编译后的桶规则判断比赛落在哪些桶，再按球队直接取出相关订阅，耗时与订阅总数无关；
+提醒按用户分别去重
+
+    index = SubscriptionIndex()
+    index.subscribe('user-1', Rule('湖人', teams=['湖人'], clock=(0, 300), margin=(0, 6)))
+    for subscriber_id, game in index.match(games):
+        ...
+"""
+
+import json
+import logging
+import threading
+import time
+
+from game_record import Game
+from poll_scheduler import game_key
+from rule_engine import GameColumns, Rule, RuleSet
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """一个用户的订阅"""
+
+    __slots__ = ('subscriber_id', 'rule')
+
+    def __init__(self, subscriber_id, rule):
+        self.subscriber_id = subscriber_id
+        self.rule = rule
+
+    @property
+    def bucket_key(self):
+        """规则中除球队以外的条件；条件相同的订阅共用一个桶"""
+        return self.rule.periods, self.rule.clock, self.rule.margin
+
+
+class _Bucket:
+    """条件相同的订阅：不限球队的订阅，以及按球队索引的订阅"""
+
+    __slots__ = ('rule', 'any_team', 'teams')
+
+    def __init__(self, key):
+        periods, clock, margin = key
+        self.rule = Rule(repr(key), periods=periods, clock=clock, margin=margin)
+        self.any_team = {}  # 用户 -> Subscription
+        self.teams = {}  # 球队 -> {用户 -> Subscription}
+
+    def add(self, subscription):
+        if subscription.rule.teams is None:
+            self.any_team[subscription.subscriber_id] = subscription
+        else:
+            for team in subscription.rule.teams:
+                self.teams.setdefault(team, {})[subscription.subscriber_id] = subscription
+
+    def remove(self, subscription):
+        if subscription.rule.teams is None:
+            self.any_team.pop(subscription.subscriber_id, None)
+        else:
+            for team in subscription.rule.teams:
+                members = self.teams.get(team)
+                if members is not None:
+                    members.pop(subscription.subscriber_id, None)
+                    if not members:
+                        del self.teams[team]
+
+    def __bool__(self):
+        return bool(self.any_team or self.teams)
+
+    def candidates(self, game):
+        """与该比赛球队相关的订阅（同时关注两队的用户只出现一次）"""
+        found = dict(self.any_team)
+        for team in (game.team1, game.team2):
+            members = self.teams.get(team)
+            if members:
+                found.update(members)
+        return found.values()
+
+
+class SubscriptionIndex:
+    """按规则条件分桶、按球队索引的订阅集合，提醒按用户去重
+
+    renotify_after: 同一用户对同一场比赛两次提醒的最短间隔（秒）
+    """
+
+    def __init__(self, renotify_after=30.0):
+        self.renotify_after = renotify_after
+        self._subscriptions = {}  # 用户 -> Subscription
+        self._buckets = {}  # 桶条件 -> _Bucket
+        self._ruleset = None  # 各桶规则编译后的 RuleSet，桶增减时重新编译
+        self._bucket_order = []  # 与 RuleSet 中规则位对应的桶
+        self._last_games = {}  # 比赛标识 -> 上次看到的 Game，用于找出状态变化的比赛
+        self._new = []  # 上次匹配之后新加入的订阅，需要对当前全部比赛检查一次
+        self._notified = {}  # 比赛标识 -> {用户 -> 最近提醒时间}，比赛从页面消失时整体清除
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def __contains__(self, subscriber_id):
+        return subscriber_id in self._subscriptions
+
+    @property
+    def bucket_count(self):
+        return len(self._buckets)
+
+    def subscribe(self, subscriber_id, rule):
+        """添加或替换一个用户的订阅"""
+        subscription = Subscription(subscriber_id, rule)
+        with self._lock:
+            self._remove(subscriber_id)
+            self._subscriptions[subscriber_id] = subscription
+            key = subscription.bucket_key
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(key)
+                self._ruleset = None
+            bucket.add(subscription)
+            self._new.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscriber_id):
+        with self._lock:
+            self._remove(subscriber_id)
+
+    def _remove(self, subscriber_id):
+        # 调用方持有锁
+        subscription = self._subscriptions.pop(subscriber_id, None)
+        if subscription is None:
+            return
+        key = subscription.bucket_key
+        bucket = self._buckets[key]
+        bucket.remove(subscription)
+        if not bucket:
+            del self._buckets[key]
+            self._ruleset = None
+
+    def _compiled(self):
+        # 调用方持有锁
+        if self._ruleset is None:
+            self._bucket_order = list(self._buckets.values())
+            self._ruleset = RuleSet(bucket.rule for bucket in self._bucket_order)
+        return self._ruleset
+
+    def match(self, games, now=None):
+        """返回本次需要提醒的 (用户, 比赛) 列表
+
+        只检查状态变化的比赛和新加入的订阅；同一用户对同一场比赛在 renotify_after 秒内只提醒一次
+        """
+        now = time.monotonic() if now is None else now
+        games = [Game.coerce(game) for game in games]
+        with self._lock:
+            current = {game_key(game): game for game in games}
+            changed_keys = {key for key, game in current.items() if self._last_games.get(key) != game}
+            changed = [current[key] for key in changed_keys]
+            for key in self._last_games.keys() - current.keys():
+                self._notified.pop(key, None)
+            self._last_games = current
+            new, self._new = self._new, []
+
+            matches = []
+            if changed and self._buckets:
+                ruleset = self._compiled()
+                columns = GameColumns(changed)
+                for game, mask in zip(columns.games, ruleset.evaluate(columns)):
+                    while mask:
+                        low = mask & -mask
+                        mask ^= low
+                        bucket = self._bucket_order[low.bit_length() - 1]
+                        for subscription in bucket.candidates(game):
+                            matches.append((subscription, game))
+
+            # 新订阅对未变化的比赛也检查一次（变化的比赛上面已经覆盖）
+            unchanged = [game for key, game in current.items() if key not in changed_keys] if new else ()
+            for subscription in new:
+                if self._subscriptions.get(subscription.subscriber_id) is not subscription:
+                    continue
+                for game in unchanged:
+                    if subscription.rule.matches(game):
+                        matches.append((subscription, game))
+
+            alerts = []
+            for subscription, game in matches:
+                notified = self._notified.setdefault(game_key(game), {})
+                last = notified.get(subscription.subscriber_id)
+                if last is not None and now - last < self.renotify_after:
+                    continue
+                notified[subscription.subscriber_id] = now
+                alerts.append((subscription.subscriber_id, game))
+            return alerts
+
+
+def load_subscriptions(path, index=None):
+    """从JSON文件加载订阅: [{"id": "user-1", "rule": {Rule.from_dict 的字典}}, ...]"""
+    index = SubscriptionIndex() if index is None else index
+    with open(path, 'r', encoding='utf-8') as f:
+        for item in json.load(f):
+            rule = dict(item['rule'])
+            rule.setdefault('name', str(item['id']))
+            index.subscribe(item['id'], Rule.from_dict(rule))
+    logger.info(f"已加载 {len(index)} 个订阅（{index.bucket_count} 个条件分桶）: {path}")
+    return index
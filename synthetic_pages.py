@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+合成比赛页面生成器
+按虎扑比赛页面的结构（list_box、team_vs_a_1/2、team_vs_c、span.num、"第四节剩1:23"）
+生成任意场数、指定状态分布的页面，并可混入格式错误的比赛盒子，用于测试解析器的规模和错误路径
+
+用法:
+    python synthetic_pages.py 10000 -o page.html --malformed 0.05 --seed 1
+"""
+
+import argparse
+import random
+import sys
+
+TEAMS = [
+    ('hawks', '老鹰'), ('celtics', '凯尔特人'), ('nets', '篮网'), ('hornets', '黄蜂'),
+    ('bulls', '公牛'), ('cavaliers', '骑士'), ('mavericks', '独行侠'), ('nuggets', '掘金'),
+    ('pistons', '活塞'), ('warriors', '勇士'), ('rockets', '火箭'), ('pacers', '步行者'),
+    ('clippers', '快船'), ('lakers', '湖人'), ('grizzlies', '灰熊'), ('heat', '热火'),
+    ('bucks', '雄鹿'), ('timberwolves', '森林狼'), ('pelicans', '鹈鹕'), ('knicks', '尼克斯'),
+    ('thunder', '雷霆'), ('magic', '魔术'), ('76ers', '76人'), ('suns', '太阳'),
+    ('blazers', '开拓者'), ('kings', '国王'), ('spurs', '马刺'), ('raptors', '猛龙'),
+    ('jazz', '爵士'), ('wizards', '奇才'),
+]
+
+PERIOD_NAMES = {'Q1': '第一节', 'Q2': '第二节', 'Q3': '第三节', 'Q4': '第四节', 'OT': '加时'}
+
+# 比赛状态及默认权重
+DEFAULT_STATES = {'scheduled': 2, 'live': 4, 'break': 1, 'clutch': 1, 'final': 2}
+
+# 格式错误的盒子类型
+MALFORMED_KINDS = ('no_team_vs_a', 'bad_score', 'no_status', 'bad_clock', 'empty_box')
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html class="expanded">
+<head>
+<meta charset='utf-8'>
+<title>
+NBA比分直播|NBA文字直播|NBA今日战报_虎扑NBA比赛中心
+</title>
+</head>
+<body>
+<div class="gamecenter_content">
+<div class="gamecenter_content_l">
+"""
+
+PAGE_TAIL = """</div>
+<div class="margin_l"></div>
+<div class="gamecenter_content_r">
+<div class="bbs_a rank_box">
+<div class="title">效率排行</div>
+</div>
+</div>
+</div>
+</body>
+</html>
+"""
+
+
+def _team_html(side, slug, name, score):
+    num = f'<span class="num ">{score}</span>\n' if score is not None else ''
+    return (f'<div class="team_vs_a_{side} clearfix">\n'
+            f'<div class="img">\n<a target="_blank" href="https://nba.hupu.com/teams/{slug}">\n'
+            f'<img src="https://gdc.hupucdn.com/gdc/nba/team/logo/{slug}.png" height="50" width="50">\n'
+            f'</a>\n</div>\n'
+            f'<div class="txt">\n{num}<span>\n'
+            f'<a target="_blank" href="https://nba.hupu.com/teams/{slug}">{name}</a>\n'
+            f'</span>\n</div>\n</div>\n')
+
+
+def _box_html(game_no, team1, team2, score1, score2, status_html, team_vs_a=True):
+    teams = ''
+    if team_vs_a:
+        teams = ('<div class="team_vs_a">\n'
+                 + _team_html(1, team1[0], team1[1], score1)
+                 + _team_html(2, team2[0], team2[1], score2)
+                 + '</div>\n')
+    return ('<div class="list_box">\n<div class="border_a">\n<div class="team_vs">\n'
+            + teams + status_html
+            + '</div>\n'
+            f'<p class="tips">\n<a target="_blank" href="https://goto.hupu.com/?a=goClick&id=2845">'
+            f'{team1[1]}vs{team2[1]}手机直播</a>\n</p>\n'
+            '<div class="table_choose clearfix">\n'
+            f'<a target="_self" href="https://nba.hupu.com/games/boxscore/{game_no}" class="d"><s></s>数据直播</a>\n'
+            f'<a target="_self" href="https://nba.hupu.com/games/playbyplay/{game_no}" class="b"><s></s>文字直播</a>\n'
+            '</div>\n</div>\n</div>\n')
+
+
+def _status_html(container, text, detail=None):
+    p = f'<p>{detail}</p>' if detail is not None else ''
+    return (f'<div class="{container}">\n<span class="a"></span>\n'
+            f'<span class="b">\n{text}{p}\n</span>\n</div>\n')
+
+
+def _clock_text(seconds):
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def _expected(team1, team2, score1, score2, period=None, clock=None, status=None):
+    return {'team1': team1, 'team2': team2, 'score1': score1, 'score2': score2,
+            'period': period, 'time_remaining': clock, 'status': status}
+
+
+def _well_formed_box(rng, game_no, team1, team2, state):
+    """生成一个格式正确的比赛盒子，返回 (html, 期望解析结果或None)"""
+    if state == 'scheduled':
+        start = f"{rng.randint(7, 11):02d}:{rng.choice(('00', '30'))}"
+        return _box_html(game_no, team1, team2, None, None,
+                         _status_html('team_vs_b', '未开始', start)), None
+
+    if state == 'final':
+        score1, score2 = rng.randint(85, 140), rng.randint(85, 140)
+        if score1 == score2:
+            score1 += 1
+        return (_box_html(game_no, team1, team2, score1, score2, _status_html('team_vs_b', '已结束')),
+                _expected(team1[1], team2[1], score1, score2))
+
+    if state == 'break':
+        period = rng.choice(('Q1', 'Q2', 'Q3'))
+        detail = f"{PERIOD_NAMES[period]}结束"
+        clock = 0
+    elif state == 'clutch':
+        period = rng.choice(('Q4', 'Q4', 'Q4', 'OT'))
+        clock = rng.randint(0, 120)
+        detail = f"{PERIOD_NAMES[period]}剩{_clock_text(clock)}"
+    else:
+        period = rng.choice(('Q1', 'Q2', 'Q3', 'Q4'))
+        clock = rng.randint(1, 719)
+        detail = f"{PERIOD_NAMES[period]}剩{_clock_text(clock)}"
+
+    base = {'Q1': 0, 'Q2': 25, 'Q3': 50, 'Q4': 75, 'OT': 100}[period]
+    score1 = base + rng.randint(0, 30)
+    if state == 'clutch':
+        score2 = score1 + rng.randint(-4, 4)
+    else:
+        score2 = base + rng.randint(0, 30)
+    status = f"进行中{detail}"
+    return (_box_html(game_no, team1, team2, score1, score2, _status_html('team_vs_c', '进行中', detail)),
+            _expected(team1[1], team2[1], score1, score2, period, clock, status))
+
+
+def _malformed_box(rng, game_no, team1, team2, kind):
+    """生成一个格式错误的比赛盒子，返回 (html, 期望解析结果或None)"""
+    score1, score2 = rng.randint(60, 110), rng.randint(60, 110)
+    live = _status_html('team_vs_c', '进行中', '第三节剩5:00')
+
+    if kind == 'no_team_vs_a':
+        return _box_html(game_no, team1, team2, score1, score2, live, team_vs_a=False), None
+    if kind == 'bad_score':
+        html = _box_html(game_no, team1, team2, score1, score2, live)
+        return html.replace(f'<span class="num ">{score1}</span>', '<span class="num ">-</span>', 1), None
+    if kind == 'no_status':
+        return (_box_html(game_no, team1, team2, score1, score2, ''),
+                _expected(team1[1], team2[1], score1, score2))
+    if kind == 'bad_clock':
+        status = _status_html('team_vs_c', '进行中', '第四节剩99:99')
+        return (_box_html(game_no, team1, team2, score1, score2, status),
+                _expected(team1[1], team2[1], score1, score2, 'Q4', None, '进行中第四节剩99:99'))
+    if kind == 'empty_box':
+        return '<div class="list_box">\n</div>\n', None
+    raise ValueError(f"未知的错误类型: {kind}")
+
+
+def _team_pair(index):
+    """第index场比赛的两支球队；超过15场时在队名后加编号保证唯一"""
+    slot = index % (len(TEAMS) // 2)
+    suffix = '' if index < len(TEAMS) // 2 else str(index // (len(TEAMS) // 2))
+    (slug1, name1), (slug2, name2) = TEAMS[2 * slot], TEAMS[2 * slot + 1]
+    return (slug1, name1 + suffix), (slug2, name2 + suffix)
+
+
+def generate_page(n_games, states=None, malformed=0.0, seed=None):
+    """生成包含 n_games 个比赛盒子的页面
+
+    states: 状态名 -> 权重（可选 scheduled/live/break/clutch/final），默认 DEFAULT_STATES
+    malformed: 格式错误盒子的比例（0~1）
+    返回 (html, expected)，expected 为解析器应返回的比赛字典列表（按页面顺序）
+    """
+    rng = random.Random(seed)
+    weights = states or DEFAULT_STATES
+    unknown = set(weights) - set(DEFAULT_STATES)
+    if unknown:
+        raise ValueError(f"未知的比赛状态: {', '.join(sorted(unknown))}")
+    names, state_weights = zip(*weights.items())
+
+    parts = [PAGE_HEAD]
+    expected = []
+    for i in range(n_games):
+        team1, team2 = _team_pair(i)
+        game_no = 170000 + i
+        if malformed and rng.random() < malformed:
+            html, game = _malformed_box(rng, game_no, team1, team2, rng.choice(MALFORMED_KINDS))
+        else:
+            state = rng.choices(names, state_weights)[0]
+            html, game = _well_formed_box(rng, game_no, team1, team2, state)
+        parts.append(html)
+        if game is not None:
+            expected.append(game)
+    parts.append(PAGE_TAIL)
+    return ''.join(parts), expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成虎扑结构的合成比赛页面")
+    parser.add_argument('games', type=int, help="比赛数量")
+    parser.add_argument('-o', '--output', help="输出文件（默认输出到标准输出）")
+    parser.add_argument('--malformed', type=float, default=0.0, help="格式错误盒子的比例（0~1）")
+    parser.add_argument('--seed', type=int, help="随机种子")
+    parser.add_argument('--states', help="状态权重，如 live=4,clutch=1,final=2")
+    args = parser.parse_args(argv)
+
+    states = None
+    if args.states:
+        states = {}
+        for item in args.states.split(','):
+            name, _, weight = item.partition('=')
+            states[name.strip()] = float(weight or 1)
+
+    html, expected = generate_page(args.games, states, args.malformed, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"已生成 {args.games} 个比赛盒子（其中 {len(expected)} 场可解析）: {args.output}")
+    else:
+        sys.stdout.write(html)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,733 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线测试 - 不访问虎扑网站，页面数据使用 test_debug.html 和合成比赛
+
+    python -m pytest -q test_offline.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from clutch_score import ClutchTracker
+from async_engine import AsyncMonitorEngine
+from fanout_server import FanoutClient, GameHub, start_fanout_server
+from game_events import (ChangeCapture, EnteredClutchWindow, EventBus, GameAdded, GameEvent, GameFinal,
+                         GameRemoved, GameUpdated, LeftClutchWindow, PeriodChanged, ScoreChanged)
+from game_parser import BACKENDS, LXML_AVAILABLE, BoxCache, get_parser_backend
+from game_record import Game, Period
+from game_recording import ReplayDriver, SnapshotRecorder, read_snapshots
+from http_fetcher import PageFetcher
+from log_setup import RateLimitFilter
+from monitor_service import MonitorService, connect, send_command
+from nba_game_reminder import NBAGameReminder
+from notification_dispatcher import COALESCED, DROPPED, MERGED, QUEUED, NotificationDispatcher
+from notification_store import NotificationStore
+from page_archive import PageArchive
+import poll_scheduler
+from poll_scheduler import PollScheduler
+from refresh_worker import RefreshWorker
+from reminder_core import ReminderCore
+from rule_engine import GameColumns, Rule, RuleSet
+from synthetic_pages import generate_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_debug.html')
+
+
+def read_fixture():
+    with open(FIXTURE, 'rb') as f:
+        return f.read()
+
+
+def make_game(team1='湖人', team2='勇士', score1=100, score2=98, period=Period.Q4, clock=120, status='进行中'):
+    return Game(team1=team1, team2=team2, score1=score1, score2=score2, period=period, clock=clock, status=status)
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_hub_routes_user_alerts_to_bound_connections():
+    hub = GameHub(queue_size=4)
+    alice, bob, anonymous = hub.subscribe('alice'), hub.subscribe('bob'), hub.subscribe()
+    for subscriber in (alice, bob, anonymous):
+        drain(subscriber)
+
+    # 远多于队列容量的用户提醒：没有连接的用户直接跳过，已连接用户的提醒合并为一个事件
+    alerts = [(f'user-{i}', make_game(), 0.5) for i in range(1000)]
+    alerts += [('alice', make_game(), 0.5), ('alice', make_game(team1='凯尔特人'), 0.4)]
+    hub.publish_user_alerts(alerts)
+
+    assert len(hub) == 3
+    events = drain(alice)
+    assert [event for _, event, _ in events] == ['alerts']
+    assert len(events[0][2]['alerts']) == 2
+    assert drain(bob) == []
+    assert drain(anonymous) == []
+
+    hub.publish_alert(make_game())
+    assert [event for _, event, _ in drain(bob)] == ['alert']
+    hub.unsubscribe(alice)
+    hub.publish_user_alerts([('alice', make_game(), 0.5)])
+    assert len(hub) == 2
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_fanout_server_streams_to_client_and_reconnects():
+    hub = GameHub()
+    hub.publish_changes([make_game()], [])
+    server = start_fanout_server(hub, 0, heartbeat=0.1)
+    alerts = []
+    client = FanoutClient(f'http://127.0.0.1:{server.server_address[1]}', on_alert=alerts.append,
+                          reconnect_delay=0.05, timeout=5)
+    client.start()
+    try:
+        # 连接时收到全部比赛的快照，之后是增量的 games 事件和提醒
+        assert wait_until(lambda: [g.team1 for g in client.snapshot()] == ['湖人'])
+        hub.publish_changes([make_game(team1='凯尔特人', team2='热火')], [make_game()])
+        assert wait_until(lambda: [g.team1 for g in client.snapshot()] == ['凯尔特人'])
+        hub.publish_alert(make_game(team1='凯尔特人', team2='热火'), clutch=0.8)
+        assert wait_until(lambda: len(alerts) == 1)
+        assert alerts[0].team2 == '热火'
+
+        # 模拟客户端太慢：发送队列满时服务端断开该连接，客户端重连后重新获得快照
+        subscriber = next(iter(hub._subscribers))
+
+        def full(item):
+            raise queue.Full
+        subscriber.queue.put_nowait = full
+        hub.publish_changes([make_game(team1='掘金', team2='太阳')], [])
+        assert subscriber.dropped
+        assert wait_until(lambda: len(hub) == 1 and next(iter(hub._subscribers)) is not subscriber)
+        assert wait_until(lambda: sorted(g.team1 for g in client.snapshot()) == ['凯尔特人', '掘金'])
+    finally:
+        client.stop()
+        server.shutdown()
+        server.server_close()
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """返回 test_debug.html，支持 ETag 条件请求，并统计建立的连接数"""
+
+    protocol_version = 'HTTP/1.1'
+    body = b''
+    connections = []
+
+    def setup(self):
+        super().setup()
+        self.connections.append(self.client_address)
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_fetcher_304_reuses_connection():
+    handler = type('PageHandler', (_PageHandler,), {'body': read_fixture(), 'connections': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fetcher = PageFetcher(f'http://127.0.0.1:{server.server_address[1]}/nba')
+    try:
+        first = fetcher.fetch()
+        assert first.status == 200 and first.text == read_fixture().decode('utf-8')
+        for _ in range(4):
+            result = fetcher.fetch()
+            assert result.not_modified and result.ok and result.text is None
+        # 304 响应也读完正文并放回连接池，5 次请求只建立一个连接
+        assert len(handler.connections) == 1
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_recorder_resume_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    recorder = SnapshotRecorder(path, flush_rows=1)
+    recorder.record([make_game(score1=90)], ts=1.0)
+    recorder.record([make_game(score1=92)], ts=2.0)
+    recorder.close()
+    good_size = os.path.getsize(path)
+
+    # 模拟写入中断：数据块长度头完整，数据只写了一部分
+    with open(path, 'ab') as f:
+        f.write((1000).to_bytes(4, 'little') + b'x\x9c partial')
+
+    recorder = SnapshotRecorder(path, flush_rows=1)
+    assert os.path.getsize(path) == good_size
+    recorder.record([make_game(team1='凯尔特人', score1=94)], ts=3.0)
+    recorder.close()
+
+    snapshots = list(read_snapshots(path))
+    assert [ts for ts, _ in snapshots] == [1.0, 2.0, 3.0]
+    assert snapshots[-1][1][0].team1 == '凯尔特人'
+    assert snapshots[-1][1][0].score1 == 94
+
+
+class _FakeScheduler:
+    def mark_poll(self):
+        pass
+
+    def next_interval(self, games):
+        return 3600
+
+
+class _BlockingCore:
+    """第一次抓取阻塞到 release 被设置，用于在请求进行中取消"""
+
+    def __init__(self):
+        self.scheduler = _FakeScheduler()
+        self.current_games = []
+        self.last_fetch = None
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+        self.fetches = 0
+        self.ingested = []
+
+    def fetch_games(self):
+        self.fetches += 1
+        if self.fetches == 1:
+            self.fetching.set()
+            self.release.wait(5)
+        return f'page-{self.fetches}'
+
+    def parse_game_info(self, html):
+        return [html]
+
+    def ingest(self, games):
+        self.ingested.append(games)
+
+
+def test_refresh_worker_cancel_then_tap_refetches():
+    core = _BlockingCore()
+    delivered = []
+    done = threading.Event()
+    worker = RefreshWorker(core, lambda games: (delivered.append(games), done.set()))
+    try:
+        worker.set_auto(True)
+        assert core.fetching.wait(5)
+        # 进行中关闭自动刷新，随后用户点击刷新：作废的请求不更新状态，点击在它之后重新抓取
+        worker.set_auto(False)
+        worker.request()
+        core.release.set()
+        assert done.wait(5)
+        assert delivered == [['page-2']]
+        assert core.ingested == [['page-2']]
+    finally:
+        worker.stop()
+
+
+def test_dispatcher_coalesces_and_keeps_state_submitted_in_flight():
+    sending = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def send(game):
+        sent.append(game.score1)
+        if len(sent) == 1:
+            sending.set()
+            release.wait(5)
+        return True
+
+    dispatcher = NotificationDispatcher(send, workers=2, coalesce_window=60)
+    try:
+        assert dispatcher.submit('lakers', make_game(score1=90)) == QUEUED
+        assert sending.wait(5)
+        # 正在发送时提交的新状态不丢弃，发送完成后补发；排队中再提交则合并为最新状态
+        assert dispatcher.submit('lakers', make_game(score1=92)) == QUEUED
+        assert dispatcher.submit('lakers', make_game(score1=94)) == MERGED
+        release.set()
+        assert dispatcher.join(5)
+        assert sent == [90, 94]
+        # 合并窗口内不再提醒
+        assert dispatcher.submit('lakers', make_game(score1=96)) == COALESCED
+    finally:
+        release.set()
+        dispatcher.close()
+
+
+def test_dispatcher_full_queue_drops_lowest_priority():
+    sending = threading.Event()
+    release = threading.Event()
+    dropped = []
+    dispatcher = NotificationDispatcher(lambda game: (sending.set(), release.wait(5)), workers=1, maxsize=2,
+                                        on_drop=lambda key, game: dropped.append(key))
+    try:
+        # 唯一的工作线程被占住，后面的提醒都在排队
+        dispatcher.submit('busy', make_game())
+        assert sending.wait(5)
+        dispatcher.submit('low', make_game(), priority=0.1)
+        dispatcher.submit('high', make_game(), priority=0.9)
+        assert dispatcher.submit('new', make_game(), priority=0.5) == QUEUED
+        assert dropped == ['low']
+        # 新提醒的优先级低于所有排队的提醒时丢弃新提醒
+        assert dispatcher.submit('lowest', make_game(), priority=0.2) == DROPPED
+        assert dropped == ['low', 'lowest']
+        assert dispatcher.pending() == 3
+    finally:
+        release.set()
+        dispatcher.close()
+
+
+def test_dropped_alert_is_forgotten(tmp_path):
+    store = NotificationStore(str(tmp_path / 'state.jsonl'))
+    store.mark_notified('2026-10-18_湖人_勇士', 'state-1')
+    store.forget('2026-10-18_湖人_勇士')
+    assert not store.is_notified('2026-10-18_湖人_勇士', 'state-1')
+    reloaded = NotificationStore(store.path)
+    reloaded.load()
+    assert len(reloaded) == 0
+
+
+@pytest.mark.skipif(not LXML_AVAILABLE, reason="需要lxml")
+def test_box_cache_replaces_changed_game():
+    parser = get_parser_backend('lxml')
+    cache = BoxCache()
+    html = read_fixture().decode('utf-8')
+    first = cache.extract_all(parser, parser.find_boxes(html))
+    assert cache.last_misses == len(first)
+
+    changed = html.replace('<span class="num ">56</span>', '<span class="num ">58</span>', 1)
+    second = cache.extract_all(parser, parser.find_boxes(changed))
+    assert (cache.last_hits, cache.last_misses) == (len(first) - 1, 1)
+    assert second[0].score1 == 58 and second[1:] == first[1:]
+    # 按比赛编号缓存，变化的比赛覆盖旧结果而不是新增一条
+    assert len(cache.entries) == len(first)
+
+
+def test_scheduler_rearms_prediction_when_clock_is_stopped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(poll_scheduler.time, 'monotonic', lambda: now[0])
+    scheduler = PollScheduler(time_threshold=120, clutch_interval=5, lead_time=2)
+    game = {'team1': '湖人', 'team2': '勇士', 'status': '进行中', 'period': 'Q4', 'time_remaining': 150}
+
+    scheduler.observe([game])
+    assert scheduler.seconds_until_clutch() == 28
+    # 暂停：预测时刻过后时钟仍未变化，从最近一次观测重新外推，而不是每 min_interval 秒抓取
+    now[0] += 40
+    scheduler.observe([game])
+    assert scheduler.seconds_until_clutch() == 28
+    now[0] += 10
+    assert scheduler.seconds_until_clutch() == 18
+
+
+def make_core(tmp_path, cls=ReminderCore):
+    core = cls(str(tmp_path))
+    core.dispatcher.close()
+    return core
+
+
+def test_game_key_is_stable_across_midnight(tmp_path):
+    core = make_core(tmp_path)
+    before = datetime(2026, 10, 18, 23, 59).timestamp()
+    after = datetime(2026, 10, 19, 0, 1).timestamp()
+    core.track_game_dates([make_game()], now=before)
+    key = core.get_game_key(make_game())
+    core.track_game_dates([make_game()], now=after)
+    assert core.get_game_key(make_game()) == key == '2026-10-18_湖人_勇士'
+    # 比赛从页面消失后，第二天同样两队的比赛是新的标识
+    core.track_game_dates([], now=after)
+    core.track_game_dates([make_game()], now=after)
+    assert core.get_game_key(make_game()) == '2026-10-19_湖人_勇士'
+
+
+def test_legacy_state_is_migrated(tmp_path):
+    core = make_core(tmp_path)
+    game = make_game()
+    with open(core.legacy_state_file, 'w', encoding='utf-8') as f:
+        json.dump({'notified_games': [core.get_game_id(make_game(score1=90)), core.get_game_id(game)],
+                   'last_update': datetime.now().isoformat()}, f)
+    core.load_state()
+    assert core.is_notified(game)
+    assert os.path.exists(core.state_file)
+
+
+def test_rule_set_matches_rule_by_rule():
+    rules = [
+        Rule.default(),
+        Rule('湖人平局', teams=['湖人'], margin=(0, 0), clock=None),
+        Rule('加时', periods=['OT'], clock=None, margin=None),
+        Rule('大比分', periods=None, clock=(300, None), margin=(15, None)),
+        Rule('勇士', teams=['勇士'], periods=None, clock=None, margin=None),
+    ]
+    rule_set = RuleSet(rules)
+    # 合成比赛覆盖区间端点和缺失值，再加上 test_debug.html 中的真实比赛
+    rng = random.Random(18)
+    periods = [None] + list(Period)
+    games = [make_game(team1=rng.choice(['湖人', '勇士', '凯尔特人']), team2=rng.choice(['热火', '湖人', '掘金']),
+                       score1=rng.choice([None, 100, 104, 120]), score2=rng.choice([None, 96, 100, 104]),
+                       period=rng.choice(periods), clock=rng.choice([None, 0, 1, 119, 120, 121, 300, 720]))
+             for _ in range(500)]
+    parser = get_parser_backend()
+    fixture_games = [game for game in map(parser.extract, parser.find_boxes(read_fixture().decode('utf-8')))
+                     if game is not None]
+    assert fixture_games
+    games += fixture_games
+
+    masks = rule_set.evaluate(GameColumns(games))
+    assert len({mask for mask in masks}) > 4
+    for game, mask in zip(games, masks):
+        assert rule_set.rules_for(mask) == [rule for rule in rules if rule.matches(game)], game
+
+
+def test_replay_timeline_uses_recorded_timestamps(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    recorder = SnapshotRecorder(path, flush_rows=1)
+    for ts, score in ((1000.0, 90), (1010.0, 92), (1020.0, 95)):
+        recorder.record([make_game(score1=score, period=Period.Q2, clock=300)], ts=ts)
+    recorder.close()
+
+    core = make_core(tmp_path, NBAGameReminder)
+    ReplayDriver(core, speed=0).run(path)
+    # 时间线的时间列为录制时的快照时间，而不是回放时的当前时间
+    assert [sample[0] for sample in core.timeline.get(make_game()).samples()] == [1000.0, 1010.0, 1020.0]
+
+
+def test_replay_goes_through_process_games(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    recorder = SnapshotRecorder(path, flush_rows=1)
+    # 第二个快照在合并窗口（按快照时间）内，不再提醒；第三个快照已超出窗口
+    for ts, score in ((1000.0, 98), (1005.0, 99), (1040.0, 97)):
+        recorder.record([make_game(score2=score, clock=100)], ts=ts)
+    recorder.close()
+
+    reminder = make_core(tmp_path, NBAGameReminder)
+    store, dispatcher = reminder.notification_store, reminder.dispatcher
+    reminder.recorder = live = SnapshotRecorder(str(tmp_path / 'live.rec'))
+    published = []
+    reminder.publish_alert = published.append
+    result = ReplayDriver(reminder, speed=0).run(path)
+
+    assert [alert['ts'] for alert in result['alerts']] == [1000.0, 1040.0]
+    assert len(published) == 2
+    # 回放结束后恢复真实的提醒记录、通知队列和录制器，回放的快照不写入录制文件
+    assert reminder.notification_store is store and len(store) == 0
+    assert reminder.dispatcher is dispatcher and reminder.recorder is live
+    live.close()
+    assert list(read_snapshots(live.path)) == []
+
+
+def test_detection_lag_counts_from_first_snapshot_meeting_condition(tmp_path):
+    core = make_core(tmp_path)
+    key = core.get_game_key(make_game())
+    lag = metrics.DETECTION_LAG._default()
+    count, total = lag.count, lag.sum
+
+    # 第一次轮询时比赛进入关键时刻，第二次轮询（比分变化）后才发出提醒：延迟从第一次轮询的快照算起
+    polled = time.time() - 10
+    core.ingest([make_game(period=Period.Q3, clock=300)], now=polled - 5)
+    core.ingest([make_game(clock=100)], now=polled)
+    core.ingest([make_game(score1=101, clock=90)], now=polled + 5)
+    assert core.condition_first_met[key] == polled
+    core.send_notification(make_game(score1=101, clock=90))
+    assert lag.count == count + 1 and lag.sum - total >= 10
+    assert key not in core.condition_first_met
+
+
+def test_detection_lag_entry_removed_when_coalesced_or_dropped(tmp_path):
+    core = make_core(tmp_path)
+    core.dispatcher = NotificationDispatcher(lambda game: True, workers=1, maxsize=1, coalesce_window=60,
+                                             on_drop=lambda key, game: core.drop_alert(key))
+    try:
+        game = make_game(clock=100)
+        key = core.get_game_key(game)
+        core.ingest([game])
+        core.submit_alert(game)
+        assert core.dispatcher.join(5)
+        core.condition_first_met[key] = time.time()
+        assert core.submit_alert(make_game(score1=101, clock=90)) == COALESCED
+        assert key not in core.condition_first_met
+        # 合并窗口内的状态变化没有提醒，不记录为已提醒
+        assert not core.is_notified(make_game(score1=101, clock=90))
+
+        core.condition_first_met['dropped'] = time.time()
+        core.drop_alert('dropped')
+        assert 'dropped' not in core.condition_first_met
+    finally:
+        core.dispatcher.close()
+
+
+class _SlowFetcher:
+    def __init__(self):
+        self.resets = 0
+
+    def reset_validators(self):
+        self.resets += 1
+
+
+class _SlowReminder:
+    """抓取阻塞到 release 被设置"""
+
+    def __init__(self):
+        self.scheduler = _FakeScheduler()
+        self.fetcher = _SlowFetcher()
+        self.current_games = []
+        self.last_fetch = None
+        self.release = threading.Event()
+        self.fetches = 0
+
+    def fetch_games(self):
+        self.fetches += 1
+        self.release.wait(5)
+        return None
+
+
+def test_async_engine_timed_out_step_is_not_restarted():
+    reminder = _SlowReminder()
+    engine = AsyncMonitorEngine(reminder, fetch_timeout=0.05)
+
+    async def scenario():
+        await engine.poll_once()
+        # 超时的抓取仍在线程中运行：下一轮不再开始新的抓取
+        await engine.poll_once()
+        assert reminder.fetches == 1
+        reminder.release.set()
+        await asyncio.wait_for(asyncio.shield(engine._running['fetch:games']), 5)
+        await asyncio.sleep(0)
+        # 超时的抓取结束后清除条件请求头，下一轮重新抓取
+        assert reminder.fetcher.resets == 1
+        await engine.poll_once()
+        assert reminder.fetches == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reminder.release.set()
+        engine.io_executor.shutdown()
+        engine.parse_executor.shutdown()
+
+
+def test_scheduler_follows_alert_rules(tmp_path):
+    core = make_core(tmp_path)
+    assert core.scheduler.time_threshold == 120
+    core.TIME_THRESHOLD = 60
+    assert core.scheduler.time_threshold == 60
+    core.ALERT_RULES = [Rule('最后五分钟', clock=(0, 300)), Rule('第二节', periods=['Q2'], clock=(0, 600))]
+    assert core.scheduler.time_threshold == 300
+    # 剩余 250 秒已在新规则的提醒范围内，按密集间隔轮询
+    assert core.scheduler.policy_interval([make_game(clock=250)]) == core.scheduler.clutch_interval
+
+
+def test_monitor_service_ipc_protocol(tmp_path):
+    reminder = make_core(tmp_path, NBAGameReminder)
+    reminder.fetch_games = lambda: read_fixture().decode('utf-8')
+    with tempfile.TemporaryDirectory() as tmp:
+        # Unix套接字路径长度有限，不使用较长的 tmp_path
+        address = os.path.join(tmp, 'nba.sock')
+        service = MonitorService(address, reminder, heartbeat=0.1)
+        service.start()
+        try:
+            games = reminder.parse_game_info(reminder.fetch_games())
+            reminder.ingest(games)
+            assert games
+
+            snapshot = send_command(address, 'snapshot')
+            assert [g['team1'] for g in snapshot['games']] == [g.team1 for g in games]
+            status = send_command(address, 'status')
+            assert status['pid'] == os.getpid() and status['games'] == len(games)
+            assert status['pending_alerts'] == 0
+            assert send_command(address, 'refresh') == {'ok': True}
+            assert reminder.wakeup.is_set()
+            assert 'error' in send_command(address, 'unknown')
+
+            with connect(address) as sock, sock.makefile('rb') as stream:
+                sock.sendall(json.dumps({'cmd': 'subscribe', 'subscriber': 'alice'}).encode('utf-8') + b'\n')
+
+                def next_event():
+                    while True:
+                        message = json.loads(stream.readline())
+                        if message['event'] != 'ping':
+                            return message
+
+                first = next_event()
+                assert first['event'] == 'snapshot' and len(first['data']['games']) == len(games)
+                assert wait_until(lambda: send_command(address, 'status')['subscribers'] == 1)
+                # 只收到绑定的订阅用户的提醒
+                service.hub.publish_user_alerts([('bob', games[0], 0.1), ('alice', games[-1], 0.9)])
+                message = next_event()
+                assert message['event'] == 'alerts'
+                assert [item['game']['team1'] for item in message['data']['alerts']] == [games[-1].team1]
+                assert message['data']['alerts'][0]['clutch'] == 0.9
+                sock.shutdown(socket.SHUT_RDWR)
+        finally:
+            service.stop()
+        assert not os.path.exists(address)
+
+
+def extract_games(parser, html):
+    return [game for game in map(parser.extract, parser.find_boxes(html)) if game is not None]
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_synthetic_page_parses_to_expected_records(backend):
+    # 混入各种格式错误的盒子：错误的盒子被跳过或按生成器给出的记录解析
+    html, expected = generate_page(200, malformed=0.2, seed=3)
+    games = extract_games(get_parser_backend(backend), html)
+    assert games == [Game.from_dict(data) for data in expected]
+    assert len(games) < 200
+
+
+@pytest.mark.skipif(not LXML_AVAILABLE, reason="需要lxml")
+def test_lxml_and_bs4_backends_agree():
+    lxml_parser, soup_parser = get_parser_backend('lxml'), get_parser_backend('bs4')
+    for html in (generate_page(300, malformed=0.3, seed=7)[0], read_fixture().decode('utf-8')):
+        games = extract_games(lxml_parser, html)
+        assert games and games == extract_games(soup_parser, html)
+
+
+def test_game_dict_round_trip():
+    game = make_game(period=Period.OT, clock=61, status='进行中')
+    data = game.to_dict()
+    assert data == {'team1': '湖人', 'team2': '勇士', 'score1': 100, 'score2': 98, 'period': 'OT',
+                    'time_remaining': 61, 'status': '进行中'}
+    assert Game.coerce(data) == game
+    assert Game.coerce(game) is game
+    # 旧的比赛字典接口
+    assert game['time_remaining'] == 61 and game.get('period') == 'OT' and game.get('unknown', 0) == 0
+    empty = Game()
+    assert Game.from_dict(empty.to_dict()) == empty
+    assert Game.from_dict({'period': 'q4'}).period is Period.Q4
+
+
+def test_page_archive_dedup_and_time_lookup(tmp_path):
+    archive = PageArchive(str(tmp_path / 'pages'))
+    page_a, page_b = read_fixture().decode('utf-8'), generate_page(5, seed=1)[0]
+    digests = [archive.store(html, ts=ts) for ts, html in
+               ((100.0, page_a), (110.0, page_a), (120.0, page_b), (130.0, page_a), (140.0, page_b))]
+    # 相同内容只保存一份，索引记录每次抓取
+    assert (archive.stored, archive.deduplicated) == (2, 3)
+    assert len(archive) == 5 and len(set(digests)) == 2
+    assert archive.get(digests[2]) == page_b
+
+    assert [ts for ts, _ in archive.scan(110.0, 140.0)] == [110.0, 120.0, 130.0]
+    assert [ts for ts, _ in archive.scan(115.0)] == [120.0, 130.0, 140.0]
+    assert list(archive.scan(141.0)) == []
+    assert archive.page_at(125.0) == (120.0, page_b)
+    assert archive.page_at(130.0) == (130.0, page_a)
+    assert archive.page_at(99.0) is None
+
+    # 只读打开：可以查询，不能写入
+    reader = PageArchive(archive.root, read_only=True)
+    assert [html for _, html in reader.pages(130.0)] == [page_a, page_b]
+    with pytest.raises(PermissionError):
+        reader.store(page_a)
+
+
+def test_clutch_tracker_ranks_close_late_games_first():
+    tracker = ClutchTracker()
+    tie = make_game(score1=101, score2=101, clock=30)
+    blowout = make_game(team1='凯尔特人', team2='热火', score1=120, score2=100, clock=30)
+    early = make_game(team1='掘金', team2='太阳', score1=50, score2=50, period=Period.Q2, clock=300)
+    final = make_game(team1='雄鹿', team2='骑士', score1=99, score2=98, clock=0, status='已结束')
+    scores = tracker.update([blowout, tie, early, final])
+
+    assert scores[1] > scores[2] > scores[0]
+    assert scores[3] == 0.0
+    assert [key for key, _ in tracker.ranked()] == [('湖人', '勇士'), ('掘金', '太阳'), ('凯尔特人', '热火')]
+    assert tracker.win_probability(tie) == pytest.approx(0.5)
+    assert tracker.win_probability(blowout) > 0.99
+
+    # 领先方持续得分：走势推高胜率，紧张度下降
+    tracker.update([make_game(score1=105, score2=101, clock=10)])
+    assert tracker.score(tie) < scores[1]
+    assert ('凯尔特人', '热火') not in tracker.games
+
+
+def test_change_capture_event_types():
+    capture = ChangeCapture(lambda game: game.period == Period.Q4 and game.clock <= 120)
+
+    def kinds(games):
+        return [type(event) for event in capture.diff(games)]
+
+    q3 = make_game(period=Period.Q3, clock=30)
+    other = make_game(team1='凯尔特人', team2='热火', period=Period.Q2, clock=300)
+    assert kinds([q3, other]) == [GameAdded, GameAdded]
+    # 没有变化的比赛不产生事件
+    assert kinds([q3, other]) == []
+    assert kinds([make_game(score1=102, period=Period.Q3, clock=30), other]) == [ScoreChanged, GameUpdated]
+    assert kinds([make_game(score1=102, period=Period.Q4, clock=100), other]) == \
+        [PeriodChanged, EnteredClutchWindow, GameUpdated]
+    assert kinds([make_game(score1=102, period=Period.Q4, clock=0, status='已结束'), other]) == \
+        [GameFinal, GameUpdated]
+    assert kinds([make_game(score1=102, period=Period.Q4, clock=0, status='已结束')]) == [GameRemoved]
+    assert kinds([make_game(score1=102, period=Period.Q4, clock=200)]) == [LeftClutchWindow, GameUpdated]
+
+    # 订阅基类收到全部事件，订阅具体类型只收到该类型
+    bus = EventBus()
+    received, scores = [], []
+    bus.subscribe(GameEvent, received.append)
+    unsubscribe = bus.subscribe(ScoreChanged, scores.append)
+    bus.publish_all(capture.diff([make_game(score1=104, period=Period.Q4, clock=200)]))
+    assert [type(event) for event in received] == [ScoreChanged, GameUpdated] and len(scores) == 1
+    unsubscribe()
+    bus.publish_all(capture.diff([make_game(score1=106, period=Period.Q4, clock=200)]))
+    assert len(received) == 4 and len(scores) == 1
+
+
+def test_rate_limit_filter_reports_suppressed_count_without_new_records():
+    emitted = []
+    rate_filter = RateLimitFilter(interval=0.05)
+    rate_filter.emit = emitted.append
+
+    def record(level=logging.WARNING):
+        return logging.makeLogRecord({'name': 'nba', 'levelno': level, 'levelname': logging.getLevelName(level),
+                                      'msg': '获取页面失败: %s', 'args': ('timeout',)})
+
+    assert rate_filter.filter(record())
+    assert not rate_filter.filter(record()) and not rate_filter.filter(record())
+    assert rate_filter.filter(record(logging.INFO))
+    rate_filter.start()
+    try:
+        # 没有新的日志，后台线程在间隔过后补记省略的条数
+        assert wait_until(lambda: emitted, timeout=2)
+        assert len(emitted) == 1 and '省略 2 条' in emitted[0].getMessage()
+    finally:
+        rate_filter.stop()
+
+
+def test_alert_rules_cannot_go_stale(tmp_path):
+    core = make_core(tmp_path)
+    core.ALERT_RULES = [Rule('最后五分钟', clock=(0, 300))]
+    assert len(core.rules) == 1
+    # 原地修改会静默沿用旧的编译结果，因此规则保存为元组，修改必须重新赋值
+    with pytest.raises(AttributeError):
+        core.ALERT_RULES.append(Rule('加时', periods=['OT'], clock=None))
+    core.ALERT_RULES += (Rule('加时', periods=['OT'], clock=None),)
+    assert [rule.name for rule in core.rules.rules] == ['最后五分钟', '加时']
+    assert core.check_game_condition(make_game(period=Period.OT, clock=400))